@@ -0,0 +1,268 @@
+# agents/inference_server.py
+"""
+Local inference service: one process holds the SetOfPlayers model and the hidden states of every client,
+and many game processes ask it for their actions.
+
+Clients write the observations of their game into their own row of a shared memory block and put a small
+(client_id, current_player, new_game) request on a shared queue. The server waits for a first request,
+then keeps collecting until it has max_batch_size of them or max_wait seconds have passed, runs one
+batched forward pass, and answers each client through its own pipe.
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from agents.players import Players
+from agents.player_set import RecurrentPolicy, SetOfPlayers
+from game.hanabi_game import HanabiGame, ActionSpace
+from game.observation import ObservationEncoder, observation_size
+
+class InferenceClient:
+    """
+    Handle of one client of an InferenceServer. It must be given to its process when the process is created.
+    Each client plays one game at a time.
+    """
+    def __init__(self, client_id: int, shared_name: str, num_clients: int, num_players: int, requests, connection):
+        self.client_id = client_id
+        self.shared_name = shared_name
+        self.num_clients = num_clients
+        self.num_players = num_players
+        self.requests = requests
+        self.connection = connection
+        self._shared = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shared"] = None
+        return state
+
+    def __attach(self):
+        self._shared = shared_memory.SharedMemory(name=self.shared_name)
+        observations, legal_masks = _shared_arrays(self._shared.buf, self.num_clients, self.num_players)
+        self._observations = observations[self.client_id]
+        self._legal_mask = legal_masks[self.client_id]
+
+    def get_action(self, observations, legal_mask, current_player: int, new_game: bool = False):
+        """
+        Sends the observations of every seat of the game and waits for the action of the current player.
+        Args:
+            observations (np.ndarray): (num_players, observation_size) observations of every seat.
+            legal_mask (np.ndarray): (num_actions,) boolean legal actions.
+            current_player (int): Player to act.
+            new_game (bool): Whether a new game started since the last request, which clears the memory of the seats.
+        Returns:
+            int: Action id.
+        """
+        if self._shared is None:
+            self.__attach()
+        self._observations[...] = observations
+        self._legal_mask[...] = legal_mask
+        self.requests.put((self.client_id, current_player, new_game))
+        return self.connection.recv()
+
+    def close(self):
+        if self._shared is not None:
+            self._observations = self._legal_mask = None
+            self._shared.close()
+            self._shared = None
+
+def _shared_arrays(buffer, num_clients: int, num_players: int):
+    """
+    Returns the (num_clients, num_players, observation_size) float32 observations and the
+    (num_clients, num_actions) boolean legal masks laid out in a shared buffer.
+    """
+    size = observation_size(num_players)
+    num_actions = ActionSpace.for_players(num_players).num_actions
+    observations = np.ndarray((num_clients, num_players, size), dtype=np.float32, buffer=buffer)
+    legal_masks = np.ndarray((num_clients, num_actions), dtype=bool, buffer=buffer, offset=observations.nbytes)
+    return observations, legal_masks
+
+def _shared_size(num_clients: int, num_players: int):
+    num_actions = ActionSpace.for_players(num_players).num_actions
+    return num_clients * (num_players * observation_size(num_players) * 4 + num_actions)
+
+class InferenceServer:
+    """
+    Runs a RecurrentPolicy for many client processes, in dynamic batches.
+
+    Args:
+        model (RecurrentPolicy): The model, copied once into the server process.
+        num_players (int): Number of players of the clients' games.
+        num_clients (int): Number of clients, see clients.
+        max_batch_size (int): Largest number of requests in one forward pass.
+        max_wait (float): Longest time, in seconds, to wait for more requests after the first one of a batch.
+        greedy (bool): Take the most likely actions instead of sampling.
+        seed (int): Seed of the action sampling.
+
+    Attributes:
+        clients (list): One InferenceClient per client process.
+
+    Usage:
+        server = InferenceServer(model, num_players, num_clients=8)
+        server.start()
+        workers = [Process(target=play, args=(client,)) for client in server.clients]
+        ...
+        statistics = server.stop()
+    """
+    def __init__(self, model: RecurrentPolicy, num_players: int, num_clients: int, max_batch_size: int = 64,
+                 max_wait: float = 0.002, greedy: bool = False, seed: int = None):
+        if max_batch_size < 1:
+            raise ValueError("Maximum batch size must be positive.")
+        self.model = model
+        self.num_players = num_players
+        self.num_clients = num_clients
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.greedy = greedy
+        self.seed = seed
+        self.shared = shared_memory.SharedMemory(create=True, size=_shared_size(num_clients, num_players))
+        self.shared_name = self.shared.name
+        self.requests = mp.Queue()
+        self._results, results = mp.Pipe(duplex=False)
+        pipes = [mp.Pipe(duplex=False) for _ in range(num_clients)]
+        self._answers = [send for _, send in pipes]
+        self.clients = [InferenceClient(client_id, self.shared.name, num_clients, num_players, self.requests, receive)
+                        for client_id, (receive, _) in enumerate(pipes)]
+        self._process = mp.Process(target=_serve, args=(self, results), daemon=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("shared", "_results", "_process", "clients"):
+            del state[name]
+        return state
+
+    def start(self):
+        self._process.start()
+
+    def update_weights(self, weights: dict):
+        """
+        Replaces the weights of the served model, between two batches.
+        """
+        self.requests.put(("weights", weights))
+
+    def stop(self):
+        """
+        Stops the server process once the pending requests are answered, and returns its statistics:
+        requests, batches, mean_batch_size and requests_per_second.
+        """
+        self.requests.put(None)
+        statistics = self._results.recv()
+        self._process.join()
+        self.shared.close()
+        self.shared.unlink()
+        return statistics
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._process.is_alive():
+            self.stop()
+
+def _serve(server: InferenceServer, results):
+    """
+    Main loop of the server process.
+    """
+    shared = shared_memory.SharedMemory(name=server.shared_name)
+    observations, legal_masks = _shared_arrays(shared.buf, server.num_clients, server.num_players)
+    players = SetOfPlayers(server.num_players, server.model, server.num_clients, seed=server.seed)
+    requests = server.requests
+    clients = np.empty(server.max_batch_size, dtype=np.intp)
+    current_players = np.empty(server.max_batch_size, dtype=np.intp)
+    num_requests = num_batches = 0
+    start = None
+    running = True
+    while running:
+        message = requests.get()
+        deadline = time.perf_counter() + server.max_wait
+        size = 0
+        while True:
+            if message is None:
+                running = False
+            elif isinstance(message[0], str):
+                players.model.set_weights(message[1])
+            else:
+                client_id, current_player, new_game = message
+                if new_game:
+                    players.reset([client_id])
+                clients[size], current_players[size] = client_id, current_player
+                size += 1
+            if not running or size == server.max_batch_size:
+                break
+            try:
+                message = requests.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+        if size == 0:
+            continue
+        if start is None:
+            start = time.perf_counter()
+        batch = clients[:size]
+        hidden_states = players.hidden_states[batch]
+        actions, hidden_states = players.choose_action(observations[batch], hidden_states, legal_masks[batch],
+                                                       current_players[:size], server.greedy)
+        players.hidden_states[batch] = hidden_states
+        for client_id, action in zip(batch, actions):
+            server._answers[client_id].send(int(action))
+        num_requests += size
+        num_batches += 1
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    del observations, legal_masks
+    shared.close()
+    results.send({
+        "requests": num_requests,
+        "batches": num_batches,
+        "mean_batch_size": num_requests / num_batches if num_batches else 0.0,
+        "requests_per_second": num_requests / elapsed if elapsed else 0.0,
+    })
+
+class ServedPlayers(Players):
+    """
+    Players whose actions come from an InferenceServer, so they can be used with game.game_runner.run_game.
+    A new game is detected when the game has not been stepped yet.
+    """
+    def __init__(self, client: InferenceClient):
+        super().__init__(client.num_players)
+        self.client = client
+        self.encoder = None
+        self._last_action = None
+
+    def get_action(self, hanabi_game: HanabiGame, current_player_index: int):
+        new_game = self.encoder is None or self.encoder.game is not hanabi_game or hanabi_game.turn_count == 0
+        if new_game:
+            if self.encoder is None or self.encoder.game is not hanabi_game:
+                self.encoder = ObservationEncoder(hanabi_game, dtype=np.float32)
+            else:
+                self.encoder.reset()
+        action_id = self.client.get_action(self.encoder.observations, hanabi_game.legal_action_array(),
+                                           current_player_index, new_game)
+        self._last_action = hanabi_game.action_space.actions[current_player_index][action_id]
+        return self._last_action
+
+    def update_state(self, game_state, current_player_index: int):
+        self.encoder.update(self._last_action)
+
+def _play_client(client: InferenceClient, n_games: int, seed: int):
+    from game.game_runner import run_game
+    players = ServedPlayers(client)
+    game = HanabiGame(client.num_players, enable_log=False)
+    scores = [run_game(players, game=game, seed=seed + index) for index in range(n_games)]
+    client.close()
+    return scores
+
+# Example usage
+if __name__ == "__main__":
+    NUM_PLAYERS, NUM_CLIENTS, GAMES_PER_CLIENT = 4, 8, 20
+    model = RecurrentPolicy(observation_size(NUM_PLAYERS), ActionSpace.for_players(NUM_PLAYERS).num_actions, seed=0)
+    with InferenceServer(model, NUM_PLAYERS, NUM_CLIENTS, max_batch_size=NUM_CLIENTS, seed=0) as server:
+        workers = [mp.Process(target=_play_client, args=(client, GAMES_PER_CLIENT, 1000 * index))
+                   for index, client in enumerate(server.clients)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        print(server.stop())
@@ -1,9 +1,230 @@
+# agents/player_set.py
+import numpy as np
+
+def sigmoid(x, out=None):
+    out = np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1
+    return np.reciprocal(out, out=out)
+
+def sample_actions(logits, legal_mask=None, rng=None, greedy: bool = False):
+    """
+    Draws one action per row of logits, from the softmax restricted to the legal actions.
+    Args:
+        logits (np.ndarray): (..., num_actions) unnormalized log probabilities.
+        legal_mask (np.ndarray): Boolean array broadcastable to logits, the legal actions. Every action is legal if not given.
+        rng (np.random.Generator): Random generator, a new one if not given.
+        greedy (bool): Take the most likely legal action instead of sampling.
+    Returns:
+        np.ndarray: (...) action ids.
+    """
+    if not greedy:
+        # Gumbel-max: the argmax of logits + Gumbel noise is a sample of the softmax
+        rng = rng if rng is not None else np.random.default_rng()
+        uniform = rng.random(logits.shape, dtype=logits.dtype)
+        np.maximum(uniform, np.finfo(logits.dtype).tiny, out=uniform)  # random() may return 0, whose noise is -inf
+        logits = logits - np.log(-np.log(uniform))
+    if legal_mask is not None:
+        logits = np.where(legal_mask, logits, -np.inf)
+    return logits.argmax(axis=-1)
+
+class RecurrentPolicy:
+    """
+    Small GRU policy, in NumPy: observation -> GRU cell -> action logits.
+    The weights are either shared by every seat, or one set per seat (player index),
+    in which case they are stacked on a leading seat axis and every seat runs in the same matmul call.
+
+    Args:
+        observation_size (int): Length of the observation vectors, see game.observation.observation_size.
+        num_actions (int): Number of action ids, see ActionSpace.
+        hidden_size (int): Size of the GRU state.
+        num_seats (int): Number of seats with their own weights, None to share one set of weights.
+        seed (int): Seed of the weight initialization.
+        dtype: Data type of the weights and hidden states.
+
+    Attributes:
+        weights (dict): Arrays of the parameters, each with a leading seat axis of length 1 when shared:
+            w_input (S, observation_size, 3 * hidden_size), w_hidden (S, hidden_size, 3 * hidden_size),
+            b_input, b_hidden (S, 3 * hidden_size), w_policy (S, hidden_size, num_actions), b_policy (S, num_actions).
+            The gates are ordered reset, update, candidate.
+    """
+    def __init__(self, observation_size: int, num_actions: int, hidden_size: int = 64, num_seats: int = None,
+                 seed: int = None, dtype=np.float32):
+        self.observation_size = observation_size
+        self.num_actions = num_actions
+        self.hidden_size = hidden_size
+        self.num_seats = num_seats
+        self.dtype = np.dtype(dtype)
+        rng = np.random.default_rng(seed)
+        s = 1 if num_seats is None else num_seats
+        h = hidden_size
+        def uniform(fan_in, *shape):
+            bound = 1 / np.sqrt(fan_in)
+            return rng.uniform(-bound, bound, (s,) + shape).astype(self.dtype)
+        self.weights = {
+            "w_input": uniform(observation_size, observation_size, 3 * h),
+            "w_hidden": uniform(h, h, 3 * h),
+            "b_input": np.zeros((s, 3 * h), dtype=self.dtype),
+            "b_hidden": np.zeros((s, 3 * h), dtype=self.dtype),
+            "w_policy": uniform(h, h, num_actions),
+            "b_policy": np.zeros((s, num_actions), dtype=self.dtype),
+        }
+
+    @property
+    def shared(self):
+        return self.num_seats is None
+
+    def get_weights(self):
+        """
+        Returns a copy of the weights, to send to another process.
+        """
+        return {name: value.copy() for name, value in self.weights.items()}
+
+    def set_weights(self, weights: dict):
+        """
+        Copies weights, as returned by get_weights, into the model.
+        Raises:
+            ValueError: If a weight is missing or has the wrong shape.
+        """
+        for name, value in self.weights.items():
+            if name not in weights or np.shape(weights[name]) != value.shape:
+                raise ValueError(f"Weight {name} must have shape {value.shape}.")
+        for name, value in self.weights.items():
+            value[...] = weights[name]
+
+    def initial_state(self, num_games: int, num_players: int):
+        """
+        Returns zeroed hidden states for every seat of num_games games, packed in one (num_games, num_players, hidden_size) array.
+        """
+        return np.zeros((num_games, num_players, self.hidden_size), dtype=self.dtype)
+
+    def seat_matmul(self, x, weight):
+        """
+        Multiplies x (num_games, num_players, n) by the weight of each seat, (S, n, m), giving (num_games, num_players, m).
+        """
+        if self.shared:
+            return x @ weight[0]
+        if x.shape[1] != self.num_seats:
+            raise ValueError(f"Expected {self.num_seats} seats, got {x.shape[1]}.")
+        return np.matmul(x.transpose(1, 0, 2), weight).transpose(1, 0, 2)
+
+    def forward(self, observations, hidden_states, out=None):
+        """
+        One GRU step for every seat of every game.
+        Args:
+            observations (np.ndarray): (num_games, num_players, observation_size) observations.
+            hidden_states (np.ndarray): (num_games, num_players, hidden_size) states before the step.
+            out (np.ndarray): Array to write the new hidden states into, may be hidden_states itself. Allocated if not given.
+        Returns:
+            logits (np.ndarray): (num_games, num_players, num_actions) action logits of every seat.
+            hidden_states (np.ndarray): The new hidden states, out if given.
+        """
+        weights = self.weights
+        h = self.hidden_size
+        bias = slice(None) if not self.shared else 0
+        gates_input = self.seat_matmul(observations, weights["w_input"])
+        gates_input += weights["b_input"][bias]
+        gates_hidden = self.seat_matmul(hidden_states, weights["w_hidden"])
+        gates_hidden += weights["b_hidden"][bias]
+        reset_update = sigmoid(gates_input[..., :2 * h] + gates_hidden[..., :2 * h])
+        reset, update = reset_update[..., :h], reset_update[..., h:]
+        candidate = np.tanh(gates_input[..., 2 * h:] + reset * gates_hidden[..., 2 * h:])
+        # h' = (1 - z) * n + z * h = n + z * (h - n)
+        new_hidden = hidden_states - candidate
+        new_hidden *= update
+        new_hidden += candidate
+        if out is None:
+            out = new_hidden
+        else:
+            out[...] = new_hidden
+        logits = self.seat_matmul(out, weights["w_policy"])
+        logits += weights["b_policy"][bias]
+        return logits, out
+
 class SetOfPlayers:
-    def __init__(self, num_players: int, model):
-        # initialize player RNN models, one per player or shared
-        pass
-
-    def choose_action(self, observations, hidden_states):
-        # input: list of obs for each player
-        # return: actions + updated hidden states
-        pass
+    """
+    The recurrent players of many concurrent games, run together on the CPU.
+    The hidden states of every seat of every game are packed in one contiguous (num_games, num_players, hidden_size) array,
+    so each turn is a single batched forward pass of the model over all of them, whose results are written back in place.
+
+    Every seat updates its memory on every turn, since all players see every action; only the current player acts.
+
+    Args:
+        num_players (int): Number of players in each game.
+        model (RecurrentPolicy): The model, with shared weights or num_players sets of weights.
+        num_games (int): Number of games played at once.
+        seed (int): Seed of the action sampling.
+
+    Usage:
+        encoder = BatchObservationEncoder(games, dtype=np.float32)
+        players = SetOfPlayers(num_players, model, len(games))
+        actions = players.choose_action(encoder.observations, legal_mask=masks, current_players=current)
+    """
+    def __init__(self, num_players: int, model: RecurrentPolicy, num_games: int = 1, seed: int = None):
+        if not model.shared and model.num_seats != num_players:
+            raise ValueError(f"The model has weights for {model.num_seats} seats, not {num_players}.")
+        self.num_players = num_players
+        self.model = model
+        self.num_games = num_games
+        self.hidden_states = model.initial_state(num_games, num_players)
+        self.rng = np.random.default_rng(seed)
+        self._games = np.arange(num_games)
+
+    def reset(self, game_indices=None):
+        """
+        Clears the memory of every seat of the given games (all of them by default), when new games start there.
+        """
+        if game_indices is None:
+            self.hidden_states[:] = 0
+        else:
+            self.hidden_states[game_indices] = 0
+
+    def choose_action(self, observations, hidden_states=None, legal_mask=None, current_players=None, greedy: bool = False):
+        """
+        Runs one forward step for every seat of every game and picks the actions.
+        Args:
+            observations (np.ndarray): (num_games, num_players, observation_size) observations of every seat,
+                for instance BatchObservationEncoder.observations.
+            hidden_states (np.ndarray): (num_games, num_players, hidden_size) states to step, updated in place.
+                Defaults to the states kept by this instance.
+            legal_mask (np.ndarray): Boolean legal actions, (num_games, num_actions) with current_players,
+                (num_games, num_players, num_actions) otherwise. Every action is legal if not given.
+            current_players (np.ndarray): (num_games,) player to act in each game. If not given, every seat picks an action.
+            greedy (bool): Take the most likely legal actions instead of sampling.
+        Returns:
+            actions (np.ndarray): (num_games,) action ids of the current players, or (num_games, num_players) without current_players.
+            hidden_states (np.ndarray): The updated hidden states.
+        """
+        if hidden_states is None:
+            hidden_states = self.hidden_states
+        logits, hidden_states = self.model.forward(observations, hidden_states, out=hidden_states)
+        if current_players is not None:
+            logits = logits[np.arange(len(logits)), current_players]
+        return sample_actions(logits, legal_mask, self.rng, greedy), hidden_states
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from game.hanabi_game import HanabiGame, ActionSpace
+    from game.observation import BatchObservationEncoder, observation_size
+    NUM_PLAYERS, NUM_GAMES, TURNS = 4, 256, 200
+    games = [HanabiGame(NUM_PLAYERS, enable_log=False, seed=index) for index in range(NUM_GAMES)]
+    encoder = BatchObservationEncoder(games, dtype=np.float32)
+    model = RecurrentPolicy(observation_size(NUM_PLAYERS), ActionSpace.for_players(NUM_PLAYERS).num_actions, seed=0)
+    players = SetOfPlayers(NUM_PLAYERS, model, NUM_GAMES, seed=0)
+    masks = np.empty((NUM_GAMES, model.num_actions), dtype=bool)
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        for index, game in enumerate(games):
+            masks[index] = game.legal_action_array()
+        current = np.array([game.current_player_index for game in games])
+        actions, _ = players.choose_action(encoder.observations, legal_mask=masks, current_players=current)
+        for index, game in enumerate(games):
+            player = game.current_player_index
+            game.step_id(int(actions[index]))
+            encoder.update(index, game.action_space.actions[player][actions[index]])
+            if game.is_game_over():
+                game.reset()
+                encoder.encoders[index].reset()
+                players.reset([index])
+    print(f"{NUM_GAMES * TURNS / (time.perf_counter() - start):.0f} turns/s")
@@ -7,8 +7,33 @@ class Players(ABC):
 
     @abstractmethod
     def update_state(self, game_state):
+        """
+        Called after every step with the StepEvent returned by HanabiGame.step, and the index of the acting player.
+        """
         pass
 
     @abstractmethod
     def get_action(self, hanabi_game):
         pass
+
+class BatchPolicy(ABC):
+    """
+    Players that choose the actions of many games in one call, as integer ids of ActionSpace.
+    Works with HanabiBatchEnv and BatchObservationEncoder:
+        actions = policy.get_actions(encoder.gather(env.current_player_index), env.legal_action_mask())
+        env.step(actions)
+    """
+    def __init__(self, num_players):
+        self.num_players = num_players
+
+    @abstractmethod
+    def get_actions(self, batch_observation, legal_mask):
+        """
+        Args:
+            batch_observation (np.ndarray): (num_games, observation_size) observations of the current players.
+                Policies that do not look at the game may be given None.
+            legal_mask (np.ndarray): (num_games, num_actions) boolean array of the legal action ids.
+        Returns:
+            np.ndarray: (num_games,) legal action ids.
+        """
+        pass
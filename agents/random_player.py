@@ -1,12 +1,14 @@
 import random
-from game.hanabi_game import HanabiGame, HanabiGameState, Action, ActionType, HintType
+import numpy as np
+from agents.players import BatchPolicy
+from game.hanabi_game import HanabiGame, StepEvent, Action, ActionType, HintType, ActionSpace
 
 class RandomPlayers:
     def __init__(self, num_players):
         self.num_players = num_players
         pass
 
-    def update_state(self, game_state: HanabiGameState, current_player_index: int):
+    def update_state(self, game_state: StepEvent, current_player_index: int):
         """
         Update the internal state of the player based on the game state.
         This method should be called at the start of each turn.
@@ -35,7 +37,7 @@ class RandomPlayers:
             target_player = random.choice([i for i in range(hanabi_game.NUM_PLAYERS) if i != current_player_index])
             hint_type = random.choice([HintType.COLOUR, HintType.NUMBER])
             if hint_type == HintType.COLOUR:
-                hint_colour = random.choice(hanabi_game.COLOURS)
+                hint_colour = random.choice(hanabi_game.HINT_COLOURS)
                 return Action(action_type, player_index=current_player_index, target_player_index=target_player, hint_type=HintType.COLOUR, hint_value=hint_colour)
             elif hint_type == HintType.NUMBER:
                 hint_number = random.choice(hanabi_game.CARDS_PER_COLOUR)
@@ -45,3 +47,48 @@ class RandomPlayers:
         else:
             raise ValueError("Unknown action type selected")
 
+
+class BatchRandomPlayers(BatchPolicy):
+    """
+    NumPy version of RandomPlayers, choosing random legal actions for many games in one call.
+    Actions are drawn with the same distribution as RandomPlayers.get_action: an action type uniformly among
+    play, discard and (when legal) hint, then a slot uniformly, or a target, hint type and hint value uniformly,
+    numbers being drawn from CARDS_PER_COLOUR so that they are weighted by their number of copies.
+
+    Args:
+        num_players (int): Number of players in each game.
+        seed (int): Seed of the NumPy random generator.
+    """
+    def __init__(self, num_players: int, seed: int = None):
+        super().__init__(num_players)
+        self.action_space = ActionSpace.for_players(num_players)
+        self.rng = np.random.default_rng(seed)
+        h = self.action_space.hand_size
+        num_actions = self.action_space.num_actions
+        # Probability of each id given its action type, and the action type of each id
+        colours, numbers = len(HanabiGame.COLOURS), len(HanabiGame.CARDS_PER_COLOUR)
+        hint_values = np.concatenate([np.full(colours, 0.5 / colours),
+                                      0.5 * np.bincount(HanabiGame.CARDS_PER_COLOUR)[1:] / numbers])
+        self.weights = np.concatenate([np.ones(2 * h), np.tile(hint_values, num_players - 1) / (num_players - 1)])
+        self.action_types = np.repeat([0, 1, 2], [h, h, num_actions - 2 * h])
+        self.type_matrix = np.eye(3)[self.action_types]
+
+    def get_actions(self, batch_observation, legal_mask):
+        """
+        Returns one random legal action id per row of legal_mask. The observations are not used.
+        Raises:
+            ValueError: If a row of legal_mask has no legal action.
+        """
+        legal_mask = np.asarray(legal_mask, dtype=bool)
+        weights = np.where(legal_mask, self.weights, 0.0)
+        # Total weight of each action type in each game, then the same total for every legal type
+        type_totals = weights @ self.type_matrix
+        legal_types = type_totals > 0
+        if not legal_types.any(axis=1).all():
+            raise ValueError("Every game must have a legal action.")
+        weights /= np.where(legal_types, type_totals, 1.0)[:, self.action_types]
+        cumulative = np.cumsum(weights, axis=1)
+        draws = self.rng.random(len(weights)) * cumulative[:, -1]
+        actions = (cumulative <= draws[:, None]).sum(axis=1)
+        # Guards against rounding picking a trailing illegal id
+        return np.minimum(actions, legal_mask.shape[1] - 1 - np.argmax(legal_mask[:, ::-1], axis=1))
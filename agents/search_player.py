@@ -0,0 +1,244 @@
+# agents/search_player.py
+"""
+Determinized Monte Carlo search.
+
+For every move, the acting player samples deals consistent with what it knows: the cards it cannot see (its own hand
+and the deck) are shuffled again, with each card of its hand drawn among the cards its hints still allow. Every legal
+action is then tried on each sampled deal and the game is finished with a fast default policy; the action with the best
+mean final score is played. Trying all actions on the same deals keeps the comparison between them fair.
+
+Rollouts run in a pool of worker processes, each playing its own deals until the wall-clock deadline of the move or
+its share of the rollout budget. The pool can be shared between many games by passing it in; otherwise the players
+start their own and release it on close(), at the end of a with block, or when they are garbage collected.
+"""
+import multiprocessing as mp
+import os
+import random
+import time
+
+from agents.players import Players
+from game.hanabi_game import HanabiGame
+
+def determinize(game: HanabiGame, player_index: int, rng: random.Random):
+    """
+    Returns a copy of game, without log, where the cards player_index cannot see are dealt again at random:
+    its own hand and the deck are shuffled, each card of its hand being drawn among the cards its knowledge allows.
+    """
+    hand = game.cards_in_players_hands[player_index]
+    masks = game.knowledge_masks(player_index)
+    codes = game.deck_codes
+    hidden = hand + list(range(game.current_top_card, game.NUM_CARDS_IN_DECK))
+    pool = [codes[card_index] for card_index in hidden]
+    while True:
+        remaining = pool[:]
+        dealt = []
+        for mask in masks:
+            candidates = [position for position, code in enumerate(remaining) if mask >> code & 1]
+            if not candidates:
+                break
+            dealt.append(remaining.pop(rng.choice(candidates)))
+        else:
+            break
+        # Drawing slot by slot may paint itself into a corner, start again
+    rng.shuffle(remaining)
+    copy = game.clone(with_log=False)
+    copy.redeal(hidden, dealt + remaining)
+    return copy
+
+def playable_mask(game: HanabiGame):
+    """
+    Returns the bitmask of the card codes that can be played on the board right now.
+    """
+    mask = 0
+    for colour_index, played in enumerate(game.board.values()):
+        if played < game.MAX_NUMBER:
+            mask |= 1 << (colour_index * game.MAX_NUMBER + played)
+    return mask
+
+def default_policy(game: HanabiGame, rng: random.Random):
+    """
+    Fast rollout policy, returning an action id for the current player, using only what that player may know:
+    play a card its hints prove playable, else hint another player about a playable card,
+    else discard its oldest card, else give a random hint, or discard anyway when no hint token is left.
+    The player must have a legal action, as rollout ensures.
+    """
+    player_index = game.current_player_index
+    space = game.action_space
+    h = space.hand_size
+    playable = playable_mask(game)
+    masks = game.knowledge_masks(player_index)
+    for slot, mask in enumerate(masks):
+        if mask & ~playable == 0:
+            return slot
+    if game.hints_available > 0:
+        codes = game.deck_codes
+        num_players = game.NUM_PLAYERS
+        num_hint_colours = len(space.hint_colours)
+        for offset in range(num_players - 1):
+            target = (player_index + offset + 1) % num_players
+            for card_index, mask in zip(game.cards_in_players_hands[target], game.knowledge_masks(target)):
+                code = codes[card_index]
+                if playable >> code & 1 and mask & ~playable:
+                    colour, number = divmod(code, game.MAX_NUMBER)
+                    # A colour that cannot be hinted, such as rainbow, is hinted by its number
+                    value = colour if rng.random() < 0.5 and colour < num_hint_colours else num_hint_colours + number
+                    return 2 * h + offset * space.NUM_HINT_VALUES + value
+    if masks and game.hints_available < game.MAX_HINTS:
+        return h
+    if game.hints_available > 0:
+        return 2 * h + rng.randrange(space.num_actions - 2 * h)
+    # Only with max_hints = 0: no hint can be given, and the hand holds a card since a move is legal
+    return h
+
+def rollout(game: HanabiGame, rng: random.Random):
+    """
+    Plays game to the end with default_policy and returns the final score.
+    """
+    # Once the deck is empty the current player may be left with no card and no hint token
+    while game.legal_action_mask():
+        game.step_id(default_policy(game, rng))
+    return game.get_score()
+
+def search(game: HanabiGame, player_index: int, action_ids: list, deadline: float, max_deals: int, seed: int):
+    """
+    Samples deals until the deadline (time.perf_counter(), which worker processes on the same machine share) or
+    max_deals deals, and tries every action on each of them.
+    Returns (total score of each action, number of deals).
+    """
+    rng = random.Random(seed)
+    totals = [0] * len(action_ids)
+    deals = 0
+    while deals < max_deals and time.perf_counter() < deadline:
+        deal = determinize(game, player_index, rng)
+        token = deal.snapshot()
+        for position, action_id in enumerate(action_ids):
+            deal.step_id(action_id)
+            totals[position] += rollout(deal, rng)
+            deal.restore(token)
+        deals += 1
+    return totals, deals
+
+def _search_task(task):
+    return search(*task)
+
+class MonteCarloSearchPlayers(Players):
+    """
+    Players choosing every move by determinized Monte Carlo search.
+
+    Args:
+        num_players (int): Number of players in the game.
+        time_budget (float): Seconds of search per move.
+        rollout_budget (int): Maximum number of rollouts per move, None for no limit besides time_budget. A deal costs one
+            rollout per legal action, so the budget is rounded down to whole deals, split exactly across the workers.
+            At least one deal is searched, so a move with more legal actions than the budget plays one rollout per action.
+        workers (int): Number of worker processes, or of searches sent to pool at once when it is given. Defaults to
+            the number of CPUs; 1 searches in the current process, which is also what happens inside daemon processes
+            such as simulation_runner workers.
+        seed (int): Seed of the searches.
+        pool (multiprocessing.pool.Pool): Optional pool to run the searches in, shared for instance by every game of a
+            run. It belongs to the caller, and close() leaves it running.
+
+    Attributes:
+        rollouts (int): Rollouts played so far, over all moves.
+        search_time (float): Seconds spent searching so far.
+        last_move (dict): Statistics of the last move: deals, rollouts, seconds, rollouts_per_second, and the mean score of each action.
+
+    Usage:
+        with MonteCarloSearchPlayers(3, time_budget=0.1) as players:
+            score = run_game(players)
+    """
+    def __init__(self, num_players: int, time_budget: float = 0.2, rollout_budget: int = None, workers: int = None, seed: int = None,
+                 pool=None):
+        super().__init__(num_players)
+        self.time_budget = time_budget
+        self.rollout_budget = rollout_budget
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = 1 if mp.current_process().daemon else workers
+        self.rng = random.Random(seed)
+        self.rollouts = 0
+        self.search_time = 0.0
+        self.last_move = {}
+        self._pool = pool
+        self._owns_pool = False
+
+    def update_state(self, game_state, current_player_index: int):
+        pass
+
+    def get_action(self, hanabi_game: HanabiGame, current_player_index: int):
+        legal = hanabi_game.get_legal_actions()
+        if len(legal) == 1:
+            return legal[0]
+        space = hanabi_game.action_space
+        action_ids = [space.action_id(action) for action in legal]
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        # Without at least one deal the search would not compare the actions at all
+        max_deals = float("inf") if self.rollout_budget is None else max(self.rollout_budget // len(action_ids), 1)
+        game = hanabi_game.clone(with_log=False)
+        if self.workers <= 1:
+            results = [search(game, current_player_index, action_ids, deadline, max_deals, self.rng.getrandbits(64))]
+        else:
+            if self._pool is None:
+                self._pool = mp.Pool(self.workers)
+                self._owns_pool = True
+            if max_deals == float("inf"):
+                shares = [max_deals] * self.workers
+            else:
+                # The first workers take one more deal each, so that the shares add up to max_deals exactly
+                share, extra = divmod(max_deals, self.workers)
+                shares = [share + (worker < extra) for worker in range(self.workers)]
+            # Workers with no deal to search are not started
+            tasks = [(game, current_player_index, action_ids, deadline, share, self.rng.getrandbits(64)) for share in shares if share]
+            results = self._pool.map(_search_task, tasks)
+        totals = [sum(scores) for scores in zip(*(result[0] for result in results))]
+        deals = sum(result[1] for result in results)
+        elapsed = time.perf_counter() - start
+        rollouts = deals * len(action_ids)
+        self.rollouts += rollouts
+        self.search_time += elapsed
+        self.last_move = {
+            "deals": deals,
+            "rollouts": rollouts,
+            "seconds": elapsed,
+            "rollouts_per_second": rollouts / elapsed if elapsed else 0.0,
+            "mean_scores": {action_id: total / deals for action_id, total in zip(action_ids, totals)} if deals else {},
+        }
+        if not deals:
+            return legal[0]
+        return legal[max(range(len(legal)), key=totals.__getitem__)]
+
+    def rollouts_per_second(self):
+        """
+        Returns the rollout rate over every move searched so far.
+        """
+        return self.rollouts / self.search_time if self.search_time else 0.0
+
+    def close(self):
+        """
+        Stops the worker processes started by the players. A pool passed in is left to its owner.
+        """
+        if self._owns_pool:
+            self._pool.close()
+            self._pool.join()
+            self._pool, self._owns_pool = None, False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        # Fallback for players never closed, e.g. by run_game; joining could block inside the garbage collector
+        if getattr(self, "_owns_pool", False):
+            self._pool.terminate()
+
+# Example usage
+if __name__ == "__main__":
+    from game.game_runner import run_game
+    NUM_PLAYERS = 3
+    for workers in (1, os.cpu_count() or 1):
+        with MonteCarloSearchPlayers(NUM_PLAYERS, time_budget=0.1, workers=workers, seed=0) as players:
+            score = run_game(players, seed=0)
+        print(f"{workers} workers: score {score}, {players.rollouts_per_second():.0f} rollouts/s")
@@ -0,0 +1,183 @@
+# benchmarks/engine_benchmark.py
+"""
+Measures the throughput of the game engine for each player count and tracks regressions.
+
+Usage:
+    python3 -m benchmarks.engine_benchmark --output results.json
+    python3 -m benchmarks.engine_benchmark --output new.json --compare results.json --tolerance 0.1
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from game.hanabi_game import HanabiGame
+
+# For each metric, whether a higher value is better
+METRICS = {
+    "constructions_per_sec": True,
+    "steps_per_sec": True,
+    "steps_per_sec_no_log": True,
+    "legal_actions_us": False,
+    "status_us": False,
+    "clone_us": False,
+    "bytes_per_game": False,
+}
+
+def play_random_game(game: HanabiGame, rng: random.Random):
+    """
+    Plays random legal actions until the game is over, and returns the number of steps and the time spent in step().
+    """
+    steps = 0
+    elapsed = 0.0
+    while not game.is_game_over():
+        action = rng.choice(game.get_legal_actions())
+        start = time.perf_counter()
+        game.step(action, game.current_player_index)
+        elapsed += time.perf_counter() - start
+        steps += 1
+    return steps, elapsed
+
+def midgame_states(num_players: int, rng: random.Random, count: int = 64):
+    """
+    Returns games stopped after a random number of random steps, to time queries on realistic states.
+    """
+    games = []
+    for _ in range(count):
+        game = HanabiGame(num_players)
+        for _ in range(rng.randrange(30)):
+            if game.is_game_over():
+                break
+            game.step(rng.choice(game.get_legal_actions()), game.current_player_index)
+        games.append(game)
+    return games
+
+def time_per_call(function, games: list, duration: float):
+    """
+    Calls function on the games in turn for about duration seconds, and returns the mean time per call in microseconds.
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for game in games:
+            function(game)
+        calls += len(games)
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return elapsed / calls * 1e6
+
+def bench_players(num_players: int, duration: float, seed: int):
+    """
+    Runs every benchmark for one player count and returns a dictionary of METRICS.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    results = {}
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for _ in range(100):
+            HanabiGame(num_players)
+        count += 100
+    results["constructions_per_sec"] = count / (time.perf_counter() - start)
+
+    for name, enable_log in (("steps_per_sec", True), ("steps_per_sec_no_log", False)):
+        steps, elapsed = 0, 0.0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            game_steps, game_elapsed = play_random_game(HanabiGame(num_players, enable_log=enable_log), rng)
+            steps += game_steps
+            elapsed += game_elapsed
+        results[name] = steps / elapsed
+
+    games = midgame_states(num_players, rng)
+    results["legal_actions_us"] = time_per_call(HanabiGame.get_legal_actions, games, duration)
+    results["status_us"] = time_per_call(lambda game: game.status(game.current_player_index), games, duration)
+    results["clone_us"] = time_per_call(HanabiGame.clone, games, duration)
+
+    live_games = 1000
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    games = midgame_states(num_players, rng, live_games)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["bytes_per_game"] = (peak - baseline) / live_games
+    del games
+    return results
+
+def run(player_counts: list, duration: float, seed: int):
+    """
+    Runs the benchmarks for every player count and returns the results with some metadata.
+    """
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "duration": duration,
+            "seed": seed,
+        },
+        "results": {str(num_players): bench_players(num_players, duration, seed) for num_players in player_counts},
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """
+    Compares results to a baseline and returns the regressions, as (player count, metric, baseline, current, relative change).
+    A metric regresses when it is worse than the baseline by more than tolerance, relative to the baseline.
+    """
+    regressions = []
+    for players, metrics in results["results"].items():
+        for metric, value in metrics.items():
+            previous = baseline["results"].get(players, {}).get(metric)
+            if not previous:
+                continue
+            change = (value - previous) / previous
+            worse = -change if METRICS[metric] else change
+            if worse > tolerance:
+                regressions.append((players, metric, previous, value, change))
+    return regressions
+
+def print_results(results: dict, baseline: dict = None):
+    for players, metrics in results["results"].items():
+        print(f"{players} players:")
+        for metric, value in metrics.items():
+            line = f"  {metric:<24}{value:>14.2f}"
+            previous = baseline["results"].get(players, {}).get(metric) if baseline else None
+            if previous:
+                line += f"  ({(value - previous) / previous:+.1%} vs baseline)"
+            print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Hanabi game engine.")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 3, 4, 5], help="Player counts to benchmark.")
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds spent on each measurement.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="File to save the results to, as JSON.")
+    parser.add_argument("--compare", help="JSON results of a previous run to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative slowdown allowed before flagging a regression.")
+    args = parser.parse_args(argv)
+
+    results = run(args.players, args.duration, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for players, metric, previous, value, change in regressions:
+            print(f"REGRESSION: {players} players {metric}: {previous:.2f} -> {value:.2f} ({change:+.1%})")
+        if regressions:
+            return 1
+        print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# game/batch_env.py
+import numpy as np
+
+from game.hanabi_game import HanabiGame, ActionSpace, STANDARD_VARIANT, cards_per_player
+
+class HanabiBatchEnv:
+    """
+    Runs many Hanabi games at once, with the whole state held in NumPy arrays.
+    The rules are the same as the ones in HanabiGame.step, so results from either engine can be compared directly.
+
+    Cards are encoded as small integers, colour * 5 + (number - 1), with colours in the order of HanabiGame.COLOURS.
+    Hands store positions in the deck, exactly like HanabiGame.cards_in_players_hands.
+
+    Actions are the integer ids of ActionSpace, so HanabiGame.step_id(action_id) plays the same move.
+
+    Args:
+        num_games (int): Number of games run in parallel.
+        num_players (int): Number of players in each game (2-5).
+        seed (int): Seed for the random generator used to shuffle decks.
+
+    Raises:
+        ValueError: If the number of players is not between 2 and 5, or if there are no games.
+
+    Attributes:
+        action_space (ActionSpace): Action ids of this number of players.
+        decks (np.ndarray): (num_games, NUM_CARDS_IN_DECK) shuffled decks.
+        hands (np.ndarray): (num_games, num_players, H) deck positions of the cards in hand, -1 for empty slots.
+        hand_sizes (np.ndarray): (num_games, num_players) number of cards in each hand.
+        board (np.ndarray): (num_games, 5) highest number played for each colour.
+        discards (np.ndarray): (num_games, 25) number of discarded or misplayed copies of each card.
+        hints_available (np.ndarray): (num_games,) hint tokens left.
+        lives (np.ndarray): (num_games,) lives left.
+        current_top_card (np.ndarray): (num_games,) index of the next card to be drawn from the deck.
+        current_player_index (np.ndarray): (num_games,) player whose turn it is.
+        turn_count (np.ndarray): (num_games,) turns taken in the current game.
+    """
+    NUM_COLOURS = 5
+    NUM_NUMBERS = 5
+    MAX_HINTS = 8
+    MAX_LIVES = 3
+    CARDS_PER_COLOUR = [1, 1, 1, 2, 2, 3, 3, 4, 4, 5]
+
+    def __init__(self, num_games: int, num_players: int, seed: int = None):
+        if num_players < 2 or num_players > 5:
+            raise ValueError("Number of players must be between 2 and 5.")
+        if num_games < 1:
+            raise ValueError("Number of games must be positive.")
+        self.num_games = num_games
+        self.num_players = num_players
+        self.CARDS_PER_PLAYER = cards_per_player(num_players)
+        self.action_space = ActionSpace.for_players(num_players)
+        self.num_actions = self.action_space.num_actions
+        self.rng = np.random.default_rng(seed)
+
+        numbers = np.array(self.CARDS_PER_COLOUR, dtype=np.int8)
+        self.deck_template = np.concatenate([colour * self.NUM_NUMBERS + numbers - 1 for colour in range(self.NUM_COLOURS)]).astype(np.int8)
+        self.NUM_CARDS_IN_DECK = len(self.deck_template)
+
+        n, p, h = num_games, num_players, self.CARDS_PER_PLAYER
+        self.decks = np.empty((n, self.NUM_CARDS_IN_DECK), dtype=np.int8)
+        self.hands = np.full((n, p, h), -1, dtype=np.int8)
+        self.hand_sizes = np.zeros((n, p), dtype=np.int8)
+        self.board = np.zeros((n, self.NUM_COLOURS), dtype=np.int8)
+        self.discards = np.zeros((n, self.NUM_COLOURS * self.NUM_NUMBERS), dtype=np.int8)
+        self.hints_available = np.zeros(n, dtype=np.int8)
+        self.lives = np.zeros(n, dtype=np.int8)
+        self.current_top_card = np.zeros(n, dtype=np.int16)
+        self.current_player_index = np.zeros(n, dtype=np.int8)
+        self.turn_count = np.zeros(n, dtype=np.int32)
+        self._games = np.arange(n)
+        self.reset()
+
+    @staticmethod
+    def deck_from_game(game: HanabiGame):
+        """
+        Returns the deck of a HanabiGame encoded as card integers, to replay the same deal in the batch environment.
+        Raises:
+            ValueError: If the game does not play the standard rules, the only ones the batch environment runs.
+        """
+        if game.VARIANT != STANDARD_VARIANT:
+            raise ValueError(f"The batch environment only runs the standard rules, not the {game.VARIANT.name} variant.")
+        return np.frombuffer(game.deck_codes, dtype=np.int8).copy()
+
+    def reset(self, indices=None, decks=None):
+        """
+        Starts new games in the given rows (all rows by default) and deals the cards.
+        Args:
+            indices (array-like): Rows to reset. Defaults to every game.
+            decks (array-like): (len(indices), NUM_CARDS_IN_DECK) decks to use, encoded as card integers. Shuffled at random if not given.
+        """
+        if indices is None:
+            indices = self._games
+        indices = np.asarray(indices)
+        if decks is None:
+            decks = self.rng.permuted(np.broadcast_to(self.deck_template, (len(indices), self.NUM_CARDS_IN_DECK)), axis=1)
+        else:
+            decks = np.asarray(decks, dtype=np.int8)
+            if decks.shape != (len(indices), self.NUM_CARDS_IN_DECK):
+                raise ValueError(f"Decks must have shape {(len(indices), self.NUM_CARDS_IN_DECK)}.")
+            if (np.sort(decks, axis=1) != np.sort(self.deck_template)).any():
+                raise ValueError("Decks must be permutations of the standard deck.")
+        dealt = self.num_players * self.CARDS_PER_PLAYER
+        self.decks[indices] = decks
+        self.hands[indices] = np.arange(dealt, dtype=np.int8).reshape(self.num_players, self.CARDS_PER_PLAYER)
+        self.hand_sizes[indices] = self.CARDS_PER_PLAYER
+        self.board[indices] = 0
+        self.discards[indices] = 0
+        self.hints_available[indices] = self.MAX_HINTS
+        self.lives[indices] = self.MAX_LIVES
+        self.current_top_card[indices] = dealt
+        self.current_player_index[indices] = 0
+        self.turn_count[indices] = 0
+
+    def get_scores(self):
+        """
+        Returns the current score of every game.
+        """
+        return self.board.sum(axis=1, dtype=np.int32)
+
+    def is_game_over(self):
+        """
+        Returns a boolean array telling which games are over, with the same conditions as HanabiGame.is_game_over.
+        """
+        deck_empty = self.current_top_card >= self.NUM_CARDS_IN_DECK
+        last_round_done = (self.hand_sizes == self.CARDS_PER_PLAYER - 1).all(axis=1)
+        return (self.lives <= 0) | (self.board == self.NUM_NUMBERS).all(axis=1) | (deck_empty & last_round_done)
+
+    def legal_action_mask(self):
+        """
+        Returns a (num_games, num_actions) boolean array of the actions the current player of each game may take.
+        """
+        h = self.CARDS_PER_PLAYER
+        mask = np.empty((self.num_games, self.num_actions), dtype=bool)
+        hand_size = self.hand_sizes[self._games, self.current_player_index]
+        slots = np.arange(h) < hand_size[:, None]
+        mask[:, :h] = slots
+        mask[:, h:2 * h] = slots
+        mask[:, 2 * h:] = (self.hints_available > 0)[:, None]
+        return mask
+
+    def step(self, actions):
+        """
+        Applies one action per game for the current players, passes the turn and starts a new game wherever one ended.
+        Args:
+            actions (array-like): (num_games,) action integers.
+        Returns:
+            rewards (np.ndarray): Change of score in each game.
+            dones (np.ndarray): Whether each game ended with this action. Those games have already been reset.
+            scores (np.ndarray): Score of each game after the action, before any reset.
+        Raises:
+            ValueError: If any action is not legal, in which case no game is changed.
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_games,):
+            raise ValueError(f"Expected {self.num_games} actions, got shape {actions.shape}.")
+        h = self.CARDS_PER_PLAYER
+        games = self._games
+        current = self.current_player_index.astype(np.intp)
+        is_play = actions < h
+        is_discard = (actions >= h) & (actions < 2 * h)
+        is_hint = actions >= 2 * h
+        slots = np.where(is_play, actions, actions - h)
+        hand_size = self.hand_sizes[games, current]
+        illegal = (actions < 0) | (actions >= self.num_actions)
+        illegal |= (is_play | is_discard) & (slots >= hand_size)
+        illegal |= is_hint & (self.hints_available <= 0)
+        if illegal.any():
+            bad = int(np.flatnonzero(illegal)[0])
+            raise ValueError(f"Illegal action {int(actions[bad])} in game {bad}.")
+        score_before = self.get_scores()
+
+        # Plays and discards
+        moved = is_play | is_discard
+        g, p, s = games[moved], current[moved], slots[moved]
+        card = self.decks[g, self.hands[g, p, s]]
+        colour, number = card // self.NUM_NUMBERS, card % self.NUM_NUMBERS + 1
+        played = is_play[moved]
+        success = played & (self.board[g, colour] + 1 == number)
+        self.board[g[success], colour[success]] += 1
+        failed = played & ~success
+        self.lives[g[failed]] -= 1
+        to_discard = ~success
+        self.discards[g[to_discard], card[to_discard]] += 1
+        discarded = g[~played]
+        self.hints_available[discarded] = np.minimum(self.hints_available[discarded] + 1, self.MAX_HINTS)
+
+        # Remove the card from the hand, shifting the cards after it, then draw
+        for j in range(h - 1):
+            shift = j >= s
+            self.hands[g, p, j] = np.where(shift, self.hands[g, p, j + 1], self.hands[g, p, j])
+        self.hands[g, p, h - 1] = -1
+        self.hand_sizes[g, p] -= 1
+        draws = self.current_top_card[g] < self.NUM_CARDS_IN_DECK
+        g, p = g[draws], p[draws]
+        self.hands[g, p, self.hand_sizes[g, p]] = self.current_top_card[g]
+        self.hand_sizes[g, p] += 1
+        self.current_top_card[g] += 1
+
+        # Hints only spend a token, the knowledge they give is not tracked here
+        self.hints_available[is_hint] -= 1
+
+        self.current_player_index[:] = (current + 1) % self.num_players
+        self.turn_count += 1
+
+        scores = self.get_scores()
+        rewards = scores - score_before
+        dones = self.is_game_over()
+        if dones.any():
+            self.reset(np.flatnonzero(dones))
+        return rewards, dones, scores
@@ -0,0 +1,154 @@
+# game/belief.py
+import numpy as np
+
+from game.hanabi_game import HanabiGame, Action, ActionType, DECK_TEMPLATE, STANDARD_VARIANT
+
+NUM_CARD_CODES = len(HanabiGame.CARDS)
+COPIES = np.bincount(np.frombuffer(DECK_TEMPLATE, dtype=np.int8), minlength=NUM_CARD_CODES).astype(np.int8)
+
+class CardBelief:
+    """
+    Public card counting for every player of a game, kept up to date one action at a time.
+
+    unseen[p, code] is the number of copies of card CARDS[code] that player p cannot see: the ones in the deck and in
+    p's own hand, i.e. every copy minus the board, the discard pile and the other players' hands.
+    A play or discard only changes the count of the player who revealed the card, a draw the counts of everyone else,
+    and a hint no count at all, so each update is O(num_players).
+
+    The distribution of a card combines these counts with what the hints told about it (HanabiGame.knowledge_masks):
+    P(card = code) is proportional to unseen[p, code] for the codes still possible. It treats the slots independently.
+
+    Args:
+        game (HanabiGame): The game to follow. It should not have been stepped since the belief was built or reset.
+
+    Raises:
+        ValueError: If the game does not play the standard rules, whose deck COPIES counts.
+
+    Usage:
+        belief = CardBelief(game)
+        game.step(action, action.player_index)
+        belief.update(action)
+        probabilities = belief.slot_probabilities(game.current_player_index)
+    """
+    def __init__(self, game: HanabiGame):
+        if game.VARIANT != STANDARD_VARIANT:
+            raise ValueError(f"Card beliefs are only kept for the standard rules, not the {game.VARIANT.name} variant.")
+        self.game = game
+        self.num_players = game.NUM_PLAYERS
+        self.hand_size = game.CARDS_PER_PLAYER
+        self.unseen = np.empty((self.num_players, NUM_CARD_CODES), dtype=np.int8)
+        self._hands = [[] for _ in range(self.num_players)]
+        self._probabilities = [None] * self.num_players
+        self.reset()
+
+    def reset(self):
+        """
+        Counts everything from scratch, in O(deck). Needed only when the game was changed without going through update,
+        e.g. after HanabiGame.reset or restore.
+        """
+        game = self.game
+        codes = np.frombuffer(game.deck_codes, dtype=np.int8)
+        self.unseen[:] = COPIES
+        for colour_index, (colour, played) in enumerate(game.board.items()):
+            self.unseen[:, colour_index * game.MAX_NUMBER:colour_index * game.MAX_NUMBER + played] -= 1
+            for number in game.discard[colour]:
+                self.unseen[:, colour_index * game.MAX_NUMBER + number - 1] -= 1
+        for player_index in range(self.num_players):
+            hand = game.cards_in_players_hands[player_index]
+            self._hands[player_index] = hand[:]
+            in_hand = np.bincount(codes[hand], minlength=NUM_CARD_CODES).astype(np.int8)
+            self.unseen -= in_hand
+            self.unseen[player_index] += in_hand
+        self._probabilities = [None] * self.num_players
+
+    def update(self, action: Action):
+        """
+        Updates the counts after game.step(action, ...).
+        """
+        game = self.game
+        if action.type == ActionType.GIVE_HINT:
+            # Only the knowledge of the target changed
+            self._probabilities[action.target_player_index] = None
+            return
+        player_index = action.player_index
+        hand = game.cards_in_players_hands[player_index]
+        codes = game.deck_codes
+        # The card leaves the hand of its owner, who sees it for the first time
+        self.unseen[player_index, codes[self._hands[player_index][action.card_index]]] -= 1
+        if len(hand) == len(self._hands[player_index]):
+            # Everyone else sees the card drawn
+            drawn = codes[hand[-1]]
+            self.unseen[:, drawn] -= 1
+            self.unseen[player_index, drawn] += 1
+            self._probabilities = [None] * self.num_players
+        else:
+            self._probabilities[player_index] = None
+        self._hands[player_index] = hand[:]
+
+    def unseen_counts(self, player_index: int):
+        """
+        Returns the (25,) copies of each card that a player cannot see, as a view into unseen.
+        """
+        return self.unseen[player_index]
+
+    def slot_probabilities(self, player_index: int):
+        """
+        Returns a (hand size, 25) float array: entry [slot, code] is the probability that the card at slot is CARDS[code],
+        from the point of view of its owner. Cached until the next update that concerns the player; do not modify it.
+        """
+        probabilities = self._probabilities[player_index]
+        if probabilities is None:
+            probabilities = self.game.hand_knowledge(player_index) * self.unseen[player_index].astype(np.float32)
+            totals = probabilities.sum(axis=1, keepdims=True)
+            probabilities /= np.where(totals > 0, totals, 1)
+            self._probabilities[player_index] = probabilities
+        return probabilities
+
+    def probabilities(self, out=None):
+        """
+        Returns the slot probabilities of every player, as a (num_players, H, 25) array with zeros for empty slots.
+        Args:
+            out (np.ndarray): Optional array to write into, for instance one row of a batch array.
+        """
+        if out is None:
+            out = np.zeros((self.num_players, self.hand_size, NUM_CARD_CODES), dtype=np.float32)
+        for player_index in range(self.num_players):
+            probabilities = self.slot_probabilities(player_index)
+            out[player_index, :len(probabilities)] = probabilities
+            out[player_index, len(probabilities):] = 0
+        return out
+
+class BatchCardBelief:
+    """
+    CardBelief of many games of the same number of players, with their probabilities gathered in one array.
+
+    Args:
+        games (list): HanabiGame instances, all with the same number of players.
+
+    Attributes:
+        beliefs (list): The CardBelief of each game.
+        unseen (np.ndarray): (len(games), num_players, 25) unseen counts; the CardBelief of game i writes into unseen[i].
+    """
+    def __init__(self, games: list):
+        num_players = games[0].NUM_PLAYERS
+        if any(game.NUM_PLAYERS != num_players for game in games):
+            raise ValueError("All games must have the same number of players.")
+        self.beliefs = [CardBelief(game) for game in games]
+        self.unseen = np.empty((len(games), num_players, NUM_CARD_CODES), dtype=np.int8)
+        for index, belief in enumerate(self.beliefs):
+            self.unseen[index] = belief.unseen
+            belief.unseen = self.unseen[index]
+        self.hand_size = games[0].CARDS_PER_PLAYER
+
+    def update(self, game_index: int, action: Action):
+        self.beliefs[game_index].update(action)
+
+    def probabilities(self, out=None):
+        """
+        Returns the slot probabilities of every player of every game, as a (len(games), num_players, H, 25) array.
+        """
+        if out is None:
+            out = np.empty(self.unseen.shape[:2] + (self.hand_size, NUM_CARD_CODES), dtype=np.float32)
+        for index, belief in enumerate(self.beliefs):
+            belief.probabilities(out[index])
+        return out
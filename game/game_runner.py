@@ -2,24 +2,78 @@
 from game.hanabi_game import HanabiGame
 from agents.players import Players  # abstract base class
 
-def run_game(players: 'Players', verbose=False):
-    game = HanabiGame(num_players=players.num_players)
+def run_game(players: 'Players', verbose=False, profiler: 'GameProfiler' = None, recorder: 'ReplayWriter' = None, game: HanabiGame = None, seed: int = None):
+    """
+    Plays one game with the given players and returns its score.
+    If a GameProfiler is given, the game is instrumented and (score, profiler.summary()) is returned instead.
+    If a ReplayWriter is given, the deck and the action ids of the game are appended to it.
+    If a game is given, it is played instead of a new one, so it can be recycled across games and looked at afterwards.
+    If a seed is given, the deal is shuffled from it: a given game is reset with it, a new game is built with it.
+    """
+    if game is None:
+        game = HanabiGame(num_players=players.num_players, enable_log=False, seed=seed)  # The log is never read here
+    elif seed is not None:
+        game.reset(seed)
+    if profiler is not None:
+        return run_profiled_game(game, players, profiler, verbose, recorder)
+    actions = bytearray() if recorder is not None else None
     while not game.is_game_over():
         current_player = game.current_player_index
         action = players.get_action(game, current_player)
         game_step_results = game.step(action, current_player)
         players.update_state(game_step_results, current_player)
+        if actions is not None:
+            actions.append(game.action_space.action_id(action))
         if verbose:
             print(f"Turn {game.turn_count}: Player {current_player} -> {action}")
+    if recorder is not None:
+        recorder.write_game(game, actions)
     return game.get_score()
 
+def run_profiled_game(game: HanabiGame, players: 'Players', profiler: 'GameProfiler', verbose=False, recorder: 'ReplayWriter' = None):
+    """
+    Same loop as run_game, calling the profiler hooks around each phase and timing them.
+    Returns (score, profiler.summary()).
+    """
+    clock = profiler.clock
+    actions = bytearray() if recorder is not None else None
+    while not game.is_game_over():
+        current_player = game.current_player_index
+        profiler.before("get_action", game, current_player, None)
+        start = clock()
+        action = players.get_action(game, current_player)
+        get_action_time = clock() - start
+        profiler.after("get_action", game, current_player, action)
+
+        profiler.before("step", game, current_player, action)
+        start = clock()
+        game_step_results = game.step(action, current_player)
+        step_time = clock() - start
+        profiler.after("step", game, current_player, action)
+
+        profiler.before("update_state", game, current_player, action)
+        start = clock()
+        players.update_state(game_step_results, current_player)
+        update_state_time = clock() - start
+        profiler.after("update_state", game, current_player, action)
+
+        profiler.record_turn(action, get_action_time, step_time, update_state_time)
+        if actions is not None:
+            actions.append(game.action_space.action_id(action))
+        if verbose:
+            print(f"Turn {game.turn_count}: Player {current_player} -> {action}")
+    if recorder is not None:
+        recorder.write_game(game, actions)
+    profiler.games += 1
+    return game.get_score(), profiler.summary()
+
 # Example usage
 if __name__ == "__main__":
     from agents.random_player import RandomPlayers
     players = RandomPlayers(4)
     score = run_game(players, True)
     print(f"Final score: {score}")
-    
+
     #from agents.naive_players import NaivePlayers
     #players = NaivePlayers(4)
     #run_game(players, True)
\ No newline at end of file
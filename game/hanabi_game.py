@@ -1,5 +1,9 @@
-from random import shuffle
+from random import shuffle, Random
 from enum import Enum
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from typing import NamedTuple
 
 class ActionType(Enum):
     PLAY_CARD = "play_card"
@@ -11,6 +15,8 @@ class HintType(Enum):
     NUMBER = "number"
 
 class Action:
+    __slots__ = ("type", "player_index", "str", "card_index", "hint_type", "hint_value", "target_player_index")
+
     def __init__(self, action_type: ActionType, player_index: int = None, card_index: int = None, hint_type: HintType = None, hint_value: int = None, target_player_index: int = None):
         """
         Initializes an action with the specified parameters.
@@ -85,6 +91,8 @@ class HanabiGameState:
         board (dict): Current state of the board, mapping colours to their played counts.
         discard (dict): Discard pile, mapping colours to lists of discarded cards.
     """
+    __slots__ = ("cards_in_players_hands", "hint_tokens", "lives", "board", "discard")
+
     def __init__(self, cards_in_players_hands = None, hint_tokens = 0, lives = 3, board = None, discard = None):
         self.cards_in_players_hands = cards_in_players_hands if cards_in_players_hands is not None else [[] for _ in range(5)]
         self.hint_tokens = hint_tokens
@@ -92,43 +100,438 @@ class HanabiGameState:
         self.board = board
         self.discard = discard
 
+class StepEvent(NamedTuple):
+    """
+    What one step changed, returned by HanabiGame.step.
+    A tuple with named fields, so it is immutable and built without a per-instance dict, and agents can update their
+    memory from it in O(1) instead of scanning the game again.
+
+    Attributes:
+        action (Action): The action taken.
+        card (int): Code of the card played or discarded, see CARDS, -1 for hints.
+        success (bool): Whether the card played went to the board, False for discards and hints.
+        drawn_slot (int): Index in the hand of the acting player of the card drawn, -1 if none was drawn.
+        hinted (tuple): Indices in the hand of the target of the cards the hint pointed at, () for plays and discards.
+        hint_change (int): Change of hints_available: -1 for a hint, 1 for a discard below MAX_HINTS, else 0.
+        life_change (int): Change of lives: -1 for a misplay, else 0.
+        state (HanabiGameState): Full state after the step when step was asked for it, else None.
+    """
+    action: Action
+    card: int
+    success: bool
+    drawn_slot: int
+    hinted: tuple
+    hint_change: int
+    life_change: int
+    state: HanabiGameState = None
+
+COLOURS = ['red', 'green', 'blue', 'yellow', 'white']
+CARDS_PER_COLOUR = [1, 1, 1, 2, 2, 3, 3, 4, 4, 5]  # Distribution of cards per color
+MAX_NUMBER = max(CARDS_PER_COLOUR)
+# Card codes are colour_index * MAX_NUMBER + number - 1, CARDS maps them back to (colour, number)
+CARDS = tuple((colour, number) for colour in COLOURS for number in range(1, MAX_NUMBER + 1))
+DECK_TEMPLATE = bytes(colour_index * MAX_NUMBER + number - 1 for colour_index in range(len(COLOURS)) for number in CARDS_PER_COLOUR)
+
+# Contents of a fresh game, copied into the buffers of HanabiGame by reset()
+SORTED_DECK = sorted(DECK_TEMPLATE)
+EMPTY_PLAYSTATE = bytes(len(DECK_TEMPLATE))
+EMPTY_BOARD = bytes(len(COLOURS))
+EMPTY_DISCARD = bytes(len(CARDS))
+
+# Card knowledge is a bitmask over card codes: bit code is set while the card may still be CARDS[code].
+# A hint ANDs the mask of every card in the target hand with the hint mask or its complement.
+FULL_KNOWLEDGE = (1 << len(CARDS)) - 1
+COLOUR_MASKS = tuple(sum(1 << code for code in range(len(CARDS)) if code // MAX_NUMBER == colour_index) for colour_index in range(len(COLOURS)))
+NUMBER_MASKS = tuple(sum(1 << code for code in range(len(CARDS)) if code % MAX_NUMBER == number - 1) for number in range(1, MAX_NUMBER + 1))
+EMPTY_KNOWLEDGE = array('I', [FULL_KNOWLEDGE]) * len(DECK_TEMPLATE)
+CARD_CODES = {card: code for code, card in enumerate(CARDS)}
+
+class Variant(NamedTuple):
+    """
+    Immutable description of the rules of a game. HanabiGame.for_variant precomputes the tables of each variant once.
+
+    Attributes:
+        name (str): Name of the variant.
+        colours (tuple): Colour names.
+        cards_per_colour (tuple): Number of each card of a colour, one entry per copy.
+        rainbow (bool): Whether the last colour is a rainbow one: every colour hint points at its cards, and no hint names it.
+        max_hints (int): Hint tokens at the start of the game, and the most that can be held.
+        max_lives (int): Lives at the start of the game.
+        hand_sizes (tuple): Cards dealt to each player in games of 2, 3, 4 and 5 players.
+    """
+    name: str = "standard"
+    colours: tuple = tuple(COLOURS)
+    cards_per_colour: tuple = tuple(CARDS_PER_COLOUR)
+    rainbow: bool = False
+    max_hints: int = 8
+    max_lives: int = 3
+    hand_sizes: tuple = (5, 5, 4, 4)
+
+STANDARD_VARIANT = Variant()
+SIX_COLOURS_VARIANT = Variant("six colours", colours=tuple(COLOURS) + ("purple",))
+RAINBOW_VARIANT = Variant("rainbow", colours=tuple(COLOURS) + ("rainbow",), rainbow=True)
+
+def variant_tables(variant: Variant):
+    """
+    Returns the rule tables of a variant, by the names of the HanabiGame class attributes holding them:
+    the same tables as the module constants above for the standard game.
+    Raises:
+        ValueError: If the engine cannot represent the variant.
+    """
+    colours = list(variant.colours)
+    max_number = max(variant.cards_per_colour, default=0)
+    if not colours or len(set(colours)) != len(colours):
+        raise ValueError("A variant needs distinct colours.")
+    if variant.rainbow and len(colours) < 2:
+        raise ValueError("A rainbow variant needs another colour besides the rainbow one.")
+    if sorted(set(variant.cards_per_colour)) != list(range(1, max_number + 1)):
+        raise ValueError("Cards per colour must contain every number from 1 to the highest one.")
+    if len(colours) * max_number > 32:
+        raise ValueError("Knowledge masks hold at most 32 distinct cards.")
+    deck_size = len(colours) * len(variant.cards_per_colour)
+    if deck_size > 127:
+        raise ValueError("Event records hold card indices up to 127.")
+    if len(variant.hand_sizes) != 4 or any(not 1 <= hand_size or num_players * hand_size > deck_size
+                                           for num_players, hand_size in enumerate(variant.hand_sizes, 2)):
+        raise ValueError("Hand sizes must be 4 positive sizes, for 2 to 5 players, that the deck can deal.")
+    if max(variant.hand_sizes) > 7:
+        raise ValueError("Event records hold the hinted slots of hands of up to 7 cards.")
+    if variant.max_hints < 0 or not 1 <= variant.max_lives <= 127:
+        raise ValueError("Hint tokens must be non-negative and lives between 1 and 127.")
+    hint_values = len(colours) - variant.rainbow + max_number
+    if any(2 * hand_size + (num_players - 1) * hint_values > 64 for num_players, hand_size in enumerate(variant.hand_sizes, 2)):
+        raise ValueError("Legal action masks hold at most 64 action ids.")
+    cards = tuple((colour, number) for colour in colours for number in range(1, max_number + 1))
+    deck_template = bytes(colour_index * max_number + number - 1 for colour_index in range(len(colours)) for number in variant.cards_per_colour)
+    full_knowledge = (1 << len(cards)) - 1
+    colour_masks = tuple(sum(1 << code for code in range(len(cards)) if code // max_number == colour_index) for colour_index in range(len(colours)))
+    hint_colours = colours[:-1] if variant.rainbow else colours
+    rainbow_mask = colour_masks[-1] if variant.rainbow else 0
+    return {
+        "VARIANT": variant,
+        "COLOURS": colours,
+        "CARDS_PER_COLOUR": list(variant.cards_per_colour),
+        "MAX_NUMBER": max_number,
+        "CARDS": cards,
+        "CARD_CODES": {card: code for code, card in enumerate(cards)},
+        "DECK_TEMPLATE": deck_template,
+        "MAX_HINTS": variant.max_hints,
+        "MAX_LIVES": variant.max_lives,
+        "HAND_SIZES": variant.hand_sizes,
+        "HINT_COLOURS": hint_colours,
+        "SORTED_DECK": sorted(deck_template),
+        "EMPTY_PLAYSTATE": bytes(len(deck_template)),
+        "EMPTY_BOARD": bytes(len(colours)),
+        "EMPTY_DISCARD": bytes(len(cards)),
+        "FULL_KNOWLEDGE": full_knowledge,
+        "COLOUR_MASKS": colour_masks,
+        "HINT_MASKS": tuple(colour_masks[colour_index] | rainbow_mask for colour_index in range(len(hint_colours))),
+        "NUMBER_MASKS": tuple(sum(1 << code for code in range(len(cards)) if code % max_number == number - 1) for number in range(1, max_number + 1)),
+        "EMPTY_KNOWLEDGE": array('I', [full_knowledge]) * len(deck_template),
+    }
+
+def knowledge_strings(mask: int, colours: list = COLOURS, colour_masks: tuple = COLOUR_MASKS, number_masks: tuple = NUMBER_MASKS):
+    """
+    Returns the hint strings describing a knowledge mask, as status() shows them:
+    the colour or number when it is known, else "N-<value>" for each value ruled out.
+    The tables default to the standard game, see variant_tables for the others.
+    """
+    strings = []
+    for values, masks in ((colours, colour_masks), (range(1, len(number_masks) + 1), number_masks)):
+        possible = [mask & value_mask != 0 for value_mask in masks]
+        if sum(possible) == 1:
+            strings.append(str(values[possible.index(True)]))
+        else:
+            strings += ["N-" + str(value) for value, is_possible in zip(values, possible) if not is_possible]
+    return strings
+
+# Event records kept by HanabiGame instead of text, formatted only when the log is read.
+# Each record is EVENT_WIDTH signed bytes: the event type followed by up to four integers.
+EVENT_DEAL = 0          # player, card index
+EVENT_PLAY = 1          # player, card index
+EVENT_MISPLAY = 2       # player, card index, lives left
+EVENT_DISCARD = 3       # player, card index
+EVENT_DRAW = 4          # player, index of the drawn card
+EVENT_HINT = 5          # target player, hint type (0 colour, 1 number), colour index or number, bitmask of hinted slots
+EVENT_ACTION_PLAY = 6       # player, card index in hand
+EVENT_ACTION_DISCARD = 7    # player, card index in hand
+EVENT_ACTION_HINT = 8       # player, hint type, colour index or number, target player
+EVENT_TURN = 9          # player receiving the turn
+EVENT_WIDTH = 5
+EVENT_CAPACITY = 256    # Records preallocated per game, enough for most games
+HINT_TYPES = (HintType.COLOUR, HintType.NUMBER)
+
+# Compact codes stored in HanabiGame playstate, in the order of CardState
+CARD_STATES = tuple(CardState)
+IN_DECK = 0
+BOARD = CARD_STATES.index(CardState.BOARD)
+DISCARD = CARD_STATES.index(CardState.DISCARD)
+
+class DeckView(Sequence):
+    """
+    Read-only view of a deck of card codes, showing each card as a (colour, number) tuple of cards, CARDS by default.
+    """
+    __slots__ = ("_codes", "_cards")
+
+    def __init__(self, codes, cards: tuple = CARDS):
+        self._codes = codes
+        self._cards = cards
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._cards[code] for code in self._codes[index]]
+        return self._cards[self._codes[index]]
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __repr__(self):
+        return repr(list(self))
+
+class PlaystateView(Mapping):
+    """
+    Read-only view of the compact playstate, mapping card indices to their CardState.
+    """
+    __slots__ = ("_codes",)
+
+    def __init__(self, codes):
+        self._codes = codes
+
+    def __getitem__(self, card_index):
+        if not isinstance(card_index, int) or not 0 <= card_index < len(self._codes):
+            raise KeyError(card_index)
+        return CARD_STATES[self._codes[card_index]]
+
+    def __iter__(self):
+        return iter(range(len(self._codes)))
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class ColourView(Mapping):
+    """
+    Read-only view of a per-colour table, mapping colour names, COLOURS by default, to values.
+    The value of a colour is read with getter(colour_index), so the view follows the game as it changes.
+    """
+    __slots__ = ("_getter", "_colours")
+
+    def __init__(self, getter, colours: list = COLOURS):
+        self._getter = getter
+        self._colours = colours
+
+    def __getitem__(self, colour):
+        try:
+            colour_index = self._colours.index(colour)
+        except ValueError:
+            raise KeyError(colour) from None
+        return self._getter(colour_index)
+
+    def __iter__(self):
+        return iter(self._colours)
+
+    def __len__(self):
+        return len(self._colours)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class HintsView(Mapping):
+    """
+    Read-only view of the card knowledge masks, mapping card indices to their hint strings.
+    The class of the game gives the tables of its variant, see knowledge_strings.
+    """
+    __slots__ = ("_masks", "_game_class")
+
+    def __init__(self, masks, game_class: type = None):
+        self._masks = masks
+        self._game_class = game_class
+
+    def __getitem__(self, card_index):
+        if not isinstance(card_index, int) or not 0 <= card_index < len(self._masks):
+            raise KeyError(card_index)
+        if self._game_class is None:
+            return knowledge_strings(self._masks[card_index])
+        game_class = self._game_class
+        return knowledge_strings(self._masks[card_index], game_class.COLOURS, game_class.COLOUR_MASKS, game_class.NUMBER_MASKS)
+
+    def __iter__(self):
+        return iter(range(len(self._masks)))
+
+    def __len__(self):
+        return len(self._masks)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+def cards_per_player(num_players: int):
+    """
+    Returns the number of cards each player holds in a standard game of num_players players.
+    """
+    return 5 if num_players <= 3 else 4
+
+class ActionSpace:
+    """
+    Canonical integer actions for a number of players, with a precomputed table of the Action objects.
+    With H the number of cards per player and P the number of players, the action ids are:
+        [0, H)                  play the card at slot id
+        [H, 2H)                 discard the card at slot id - H
+        [2H, 2H + 10(P - 1))    give a hint; with k = id - 2H, the target is (player + k // 10 + 1) % P,
+                                k % 10 < 5 hints colour COLOURS[k % 10], otherwise number k % 10 - 4
+    Targets are relative to the acting player, so an id means the same move whoever plays it.
+    In other variants, 10 and 5 become NUM_HINT_VALUES and the number of colours that can be hinted.
+
+    Args:
+        num_players (int): Number of players in the game (2-5).
+        variant (Variant): Rules of the game, the standard ones by default.
+
+    Attributes:
+        NUM_HINT_VALUES (int): Number of hints per target: colours that can be hinted, then numbers.
+        num_actions (int): Number of action ids.
+        actions (tuple): actions[player_index][action_id] is the shared Action object of that move. They must not be modified.
+        hint_mask (int): Bitmask of the hint action ids.
+        card_masks (tuple): card_masks[n] is the bitmask of the play and discard ids of a hand of n cards.
+    """
+    NUM_HINT_VALUES = len(COLOURS) + MAX_NUMBER
+
+    def __init__(self, num_players: int, variant: Variant = STANDARD_VARIANT):
+        self.num_players = num_players
+        self.variant = variant
+        self.hint_colours = variant.colours[:-1] if variant.rainbow else variant.colours
+        self.max_number = max(variant.cards_per_colour)
+        self.NUM_HINT_VALUES = len(self.hint_colours) + self.max_number
+        self.hand_size = variant.hand_sizes[num_players - 2]
+        h = self.hand_size
+        self.num_actions = 2 * h + (num_players - 1) * self.NUM_HINT_VALUES
+        self.actions = tuple(tuple(self.__build_action(player_index, action_id) for action_id in range(self.num_actions))
+                             for player_index in range(num_players))
+        self.hint_mask = ((1 << self.num_actions) - 1) ^ ((1 << 2 * h) - 1)
+        self.card_masks = tuple(((1 << n) - 1) | (((1 << n) - 1) << h) for n in range(h + 1))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def for_players(num_players: int, variant: Variant = STANDARD_VARIANT):
+        """
+        Returns the ActionSpace of a number of players and a variant, built once and shared.
+        """
+        return ActionSpace(num_players, variant)
+
+    def __build_action(self, player_index: int, action_id: int):
+        h = self.hand_size
+        if action_id < h:
+            return Action(ActionType.PLAY_CARD, player_index, action_id)
+        if action_id < 2 * h:
+            return Action(ActionType.DISCARD_CARD, player_index, action_id - h)
+        offset, value = divmod(action_id - 2 * h, self.NUM_HINT_VALUES)
+        target = (player_index + offset + 1) % self.num_players
+        colours = self.hint_colours
+        if value < len(colours):
+            return Action(ActionType.GIVE_HINT, player_index, target_player_index=target, hint_type=HintType.COLOUR, hint_value=colours[value])
+        return Action(ActionType.GIVE_HINT, player_index, target_player_index=target, hint_type=HintType.NUMBER, hint_value=value - len(colours) + 1)
+
+    def action_id(self, action: Action):
+        """
+        Returns the id of an action.
+        Raises:
+            ValueError: If the action has no id in this action space.
+        """
+        h = self.hand_size
+        if action.type == ActionType.PLAY_CARD or action.type == ActionType.DISCARD_CARD:
+            if action.card_index >= h:
+                raise ValueError(f"Card index must be lower than {h}.")
+            return action.card_index + (h if action.type == ActionType.DISCARD_CARD else 0)
+        offset = (action.target_player_index - action.player_index) % self.num_players - 1
+        if offset < 0:
+            raise ValueError("Cannot give hint to yourself.")
+        colours = self.hint_colours
+        if action.hint_type == HintType.COLOUR and action.hint_value in colours:
+            value = colours.index(action.hint_value)
+        elif action.hint_type == HintType.NUMBER and action.hint_value in range(1, self.max_number + 1):
+            value = len(colours) + action.hint_value - 1
+        else:
+            raise ValueError(f"Invalid hint: {action.hint_type} {action.hint_value}.")
+        return 2 * h + offset * self.NUM_HINT_VALUES + value
+
+def _variant_game(variant: Variant):
+    """
+    Returns an empty game of a variant, for pickle: the class of a variant is rebuilt by for_variant, not imported.
+    """
+    return object.__new__(HanabiGame.for_variant(variant))
+
+def _reduce_variant_game(game: 'HanabiGame', protocol: int):
+    return (_variant_game, (game.VARIANT,)) + object.__reduce_ex__(game, protocol)[2:]
+
 class HanabiGame:
     """
     Represents the Hanabi game state and logic.
     Initializes the game with a specified number of players.
+
+    The state is stored in a compact form: cards are small integers (colour * 5 + number - 1),
+    playstate is a bytearray of CARD_STATES indices, and the board and discard pile are fixed-size bytearrays.
+    The public attributes below are read-only views over this storage.
     
     Args:
         num_players (int): Number of players in the game (2-5).
+        enable_log (bool): Whether to record the game log. When False, log and last_round are always empty
+            and no event is recorded.
+        deck (bytes): Optional deck to deal from, as card codes in drawing order, instead of a shuffled one.
+        seed (int): Optional seed of the shuffle, see reset().
+        variant (Variant): Optional rules of the game. The game is then built as an instance of the class of the variant,
+            see for_variant; HanabiGame itself plays the standard rules.
     
     Raises:
-        ValueError: If the number of players is not between 2 and 5.
+        ValueError: If the number of players is not between 2 and 5, if deck is not a permutation of DECK_TEMPLATE,
+            or if the variant is not supported.
 
     Attributes:
         NUM_PLAYERS (int): Number of players in the game.
         COLOURS (list): List of colours used in the game.
         CARDS_PER_COLOUR (list): Distribution of cards per colour.
+        CARDS (tuple): (colour, number) tuple of each card code.
+        CARD_CODES (dict): Card code of each (colour, number) tuple.
+        VARIANT (Variant): Rules of the game.
+        MAX_HINTS (int): Hint tokens at the start, and the most that can be held.
+        MAX_LIVES (int): Lives at the start.
+        HINT_COLOURS (list): Colours that can be named in a hint.
         CARDS_PER_PLAYER (int): Number of cards each player starts with.
-        deck (list): The deck of cards used in the game.
+        action_space (ActionSpace): Integer action ids of this number of players.
+        deck (DeckView): The deck of cards used in the game, as (colour, number) tuples.
+        deck_codes (bytes): The deck of cards as card codes.
         NUM_CARDS_IN_DECK (int): Total number of cards in the deck.
-        playstate (dict): Dictionary mapping card indices to their state.
+        playstate (PlaystateView): Mapping of card indices to their state.
+        hints (HintsView): Mapping of card indices to the hint strings describing their knowledge mask.
         current_player_index (int): Index of the player whose turn it is.
         turn_count (int): Count of turns taken in the game.
         current_top_card (int): Index of the next card to be drawn from the deck.
-        log (str): Log of game actions and events.
+        log (str): Log of game actions and events, formatted from the recorded events when read.
+        events (list): Recorded events as (event type, a, b, c, d) tuples, see the EVENT_* constants.
         hints_available (int): Number of hints available to give.
         lives (int): Number of lives remaining in the game.
-        board (dict): Current state of the board, mapping colours to their played counts.
-        last_round (str): Last round played, used for logging.
+        board (ColourView): Current state of the board, mapping colours to their played counts.
+        discard (ColourView): Discard pile, mapping colours to the sorted numbers of discarded and misplayed cards.
+        last_round (str): Cards dealt or drawn during the last step, used for logging.
     
     Methods:
-        step(action: Action): Changes the state of the game according to the action taken by the player. Returns the game state after the action in the class HanabiGameState.
+        step(action: Action, current_player: int, full_state: bool): Changes the state of the game according to the action taken by the player. Returns a StepEvent.
         is_game_over(): Checks if the game is over based on lives, board state, and deck state.
         get_score(): Returns the current score based on the board state.
         status(player_index: int): Returns the status of the game from the point of view of a specified player.
+        reset(seed: int, deck: bytes): Starts a new game in the same object, reusing its buffers.
         get_legal_actions(): Let agents query what actions are valid.
+        legal_action_mask(): Legal action ids as an int bitmask, see ActionSpace.
+        legal_action_array(): Legal action ids as a NumPy boolean array.
+        step_id(action_id: int): Plays an action given by its id.
         get_current_player(): Get's index of current player.
-        clone(): Returns a deep copy of the game for simulations.
+        get_state(): Returns a HanabiGameState copy of the whole state.
+        clone(with_log: bool): Returns a deep copy of the game for simulations.
+        snapshot(): Returns a token to rewind the game to its current state.
+        restore(token: int): Undoes the steps taken since the snapshot.
+        drop_snapshots(): Stops recording the undo journal.
         render(mode='text'): Helpful for debugging or saving games visually/logically.
+        knowledge_masks(player_index: int): Knowledge bitmasks of the cards in a player's hand.
+        hand_knowledge(player_index: int): Knowledge of a player's hand as a NumPy boolean array.
     
     Private methods:
         __apply_action(action: Action): Applies the given action to the game state.
@@ -139,53 +542,247 @@ class HanabiGame:
         __pass_turn(): Passes the turn to the next player.
         __is_deck_empty(): Checks if the deck is empty.
     """
-    def __init__(self, num_players: int):
+    # Rule tables, see variant_tables; the classes of the other variants override them all
+    VARIANT = STANDARD_VARIANT
+    COLOURS = COLOURS
+    CARDS_PER_COLOUR = CARDS_PER_COLOUR
+    MAX_NUMBER = MAX_NUMBER
+    CARDS = CARDS
+    CARD_CODES = CARD_CODES
+    DECK_TEMPLATE = DECK_TEMPLATE
+    MAX_HINTS = 8
+    MAX_LIVES = 3
+    HAND_SIZES = STANDARD_VARIANT.hand_sizes
+    HINT_COLOURS = COLOURS
+    SORTED_DECK = SORTED_DECK
+    EMPTY_PLAYSTATE = EMPTY_PLAYSTATE
+    EMPTY_BOARD = EMPTY_BOARD
+    EMPTY_DISCARD = EMPTY_DISCARD
+    FULL_KNOWLEDGE = FULL_KNOWLEDGE
+    COLOUR_MASKS = COLOUR_MASKS
+    HINT_MASKS = COLOUR_MASKS
+    NUMBER_MASKS = NUMBER_MASKS
+    EMPTY_KNOWLEDGE = EMPTY_KNOWLEDGE
+
+    __slots__ = (
+        "NUM_PLAYERS", "CARDS_PER_PLAYER", "NUM_CARDS_IN_DECK", "action_space",
+        "_deck", "_playstate", "_board", "_discard",
+        "_knowledge", "cards_in_players_hands", "current_player_index", "turn_count", "current_top_card",
+        "hints_available", "lives", "_events", "_num_events", "_last_round_start", "_undo",
+    )
+
+    def __new__(cls, num_players: int = None, enable_log: bool = True, deck: bytes = None, seed: int = None, variant: Variant = None):
+        if variant is not None and variant != cls.VARIANT:
+            if cls is not HanabiGame:
+                raise ValueError(f"This class plays the {cls.VARIANT.name} variant, not {variant.name}.")
+            cls = HanabiGame.for_variant(variant)
+        return object.__new__(cls)
+
+    def __init__(self, num_players: int, enable_log: bool = True, deck: bytes = None, seed: int = None, variant: Variant = None):
         if num_players < 2 or num_players > 5:
             raise ValueError("Number of players must be between 2 and 5.")
-        # initialize deck, players, tokens, board
+        # initialize the buffers once, reset() fills them for every new game
         self.NUM_PLAYERS = num_players
-        self.COLOURS = ['red', 'green', 'blue', 'yellow', 'white']
-        self.CARDS_PER_COLOUR = [1, 1, 1, 2, 2, 3, 3, 4, 4, 5]  # Distribution of cards per color
-        self.CARDS_PER_PLAYER = 5  # Number of cards each player starts with
-        if num_players > 3:
-            self.CARDS_PER_PLAYER = 4  # Adjust for more players
-        self.deck = [(colour, number) for colour in self.COLOURS for number in self.CARDS_PER_COLOUR]
-        self.NUM_CARDS_IN_DECK = len(self.deck)
-        
-        self.playstate = {i: CardState.IN_DECK for i in range(len(self.deck))}
-        self.hints = {i:[] for i in range(len(self.deck))}  # Hints for each card index
+        self.CARDS_PER_PLAYER = self.HAND_SIZES[num_players - 2]  # Number of cards each player starts with
+        self.action_space = ActionSpace.for_players(num_players, self.VARIANT)
+        self.NUM_CARDS_IN_DECK = len(self.DECK_TEMPLATE)
+        self._deck = bytearray(self.NUM_CARDS_IN_DECK)
+        self._playstate = bytearray(self.NUM_CARDS_IN_DECK)
+        self._knowledge = array('I', self.EMPTY_KNOWLEDGE)
+        self._board = bytearray(len(self.COLOURS))
+        self._discard = bytearray(len(self.CARDS))
+        self.cards_in_players_hands = [[] for _ in range(self.NUM_PLAYERS)]
+        self._events = array('b', bytes(EVENT_WIDTH * EVENT_CAPACITY)) if enable_log else None
+        self.reset(seed, deck)
+
+    def reset(self, seed: int = None, deck: bytes = None):
+        """
+        Starts a new game in this object, reusing its buffers, and deals the cards.
+        Args:
+            seed (int): Seed of the shuffle. The deal only depends on the seed, not on the global random state.
+                When None, the deck is shuffled with the global random module.
+            deck (bytes): Deck to deal from, as card codes in drawing order, instead of a shuffled one.
+        Raises:
+            ValueError: If deck is not a permutation of DECK_TEMPLATE.
+        """
+        if deck is not None and sorted(deck) != self.SORTED_DECK:
+            raise ValueError(f"Deck must be a permutation of the {self.VARIANT.name} deck.")
+        self._playstate[:] = self.EMPTY_PLAYSTATE  # Every card starts IN_DECK
+        self._knowledge[:] = self.EMPTY_KNOWLEDGE  # Knowledge mask of each card index
+        self._board[:] = self.EMPTY_BOARD  # Highest number played per colour
+        self._discard[:] = self.EMPTY_DISCARD  # Discarded copies per card code
         self.current_player_index = 0  # Index of the player whose turn it is
         self.turn_count = 0  # Count of turns taken
         self.current_top_card = 0
-        self.log = ""
+        self._num_events = 0
+        self._last_round_start = 0
+        self._undo = None  # Undo journal, recorded once snapshot() is called
 
         #shuffle the deck
-        shuffle(self.deck)
+        if deck is not None:
+            self._deck[:] = deck
+        else:
+            self._deck[:] = self.DECK_TEMPLATE
+            if seed is None:
+                shuffle(self._deck)
+            else:
+                Random(seed).shuffle(self._deck)
 
         #deal cards to players
-        self.cards_in_players_hands = [[] for _ in range(self.NUM_PLAYERS)]
-        for player_index in range(self.NUM_PLAYERS):
+        for player_index, hand in enumerate(self.cards_in_players_hands):
+            hand.clear()
             for _ in range(self.CARDS_PER_PLAYER):
-                if self.deck:
+                if self.current_top_card < self.NUM_CARDS_IN_DECK:
                     card_index = self.current_top_card
                     self.current_top_card += 1
-                    card = self.deck[card_index]
-                    self.log += f"Player {player_index} received card {card} with index = {card_index}\n"
-                    self.cards_in_players_hands[player_index].append(card_index)
-                    self.playstate[card_index] = CardState.CardStateInPlayerHand(player_index)
+                    if self._events is not None:
+                        self.__record(EVENT_DEAL, player_index, card_index)
+                    hand.append(card_index)
+                    self._playstate[card_index] = 1 + player_index
         
-        self.MAX_HINTS = 8
-        self.hints_available = 8  # Initial hints available
-        self.lives = 3  # Initial lives
-        self.board = {colour: 0 for colour in self.COLOURS}  # Board
-        self.discard = {colour: [] for colour in self.COLOURS}  # Discard pile
-        self.last_round = self.log  # Last round played
-        pass
+        self.hints_available = self.MAX_HINTS  # Initial hints available
+        self.lives = self.MAX_LIVES  # Initial lives
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def for_variant(variant: Variant):
+        """
+        Returns the class playing a variant, built once: a subclass of HanabiGame whose class attributes hold the tables
+        of the variant, shared by all its games, so the engine reads them exactly as it reads those of the standard game.
+        The standard variant is played by HanabiGame itself.
+        Raises:
+            ValueError: If the engine cannot represent the variant.
+        """
+        if variant == STANDARD_VARIANT:
+            return HanabiGame
+        namespace = variant_tables(variant)
+        namespace["__slots__"] = ()
+        namespace["__reduce_ex__"] = _reduce_variant_game
+        return type(f"HanabiGame[{variant.name}]", (HanabiGame,), namespace)
+
+    @property
+    def log(self):
+        return "".join(self.__format_events(0))
+
+    @property
+    def last_round(self):
+        return "".join(self.__format_events(self._last_round_start, (EVENT_DEAL, EVENT_DRAW)))
+
+    @property
+    def events(self):
+        if self._events is None:
+            return []
+        return [tuple(self._events[offset:offset + EVENT_WIDTH]) for offset in range(0, self._num_events * EVENT_WIDTH, EVENT_WIDTH)]
+
+    def __record(self, event_type: int, a: int, b: int = 0, c: int = 0, d: int = 0):
+        """
+        Appends an event record to the buffer, doubling it when full.
+        """
+        events = self._events
+        offset = self._num_events * EVENT_WIDTH
+        if offset == len(events):
+            events.extend(bytes(len(events)))
+        events[offset] = event_type
+        events[offset + 1] = a
+        events[offset + 2] = b
+        events[offset + 3] = c
+        events[offset + 4] = d
+        self._num_events += 1
+
+    def __format_events(self, first_event: int, event_types: tuple = None):
+        """
+        Yields the log lines of the recorded events from first_event on, optionally only those of the given types.
+        """
+        if self._events is None:
+            return
+        events = self._events
+        for offset in range(first_event * EVENT_WIDTH, self._num_events * EVENT_WIDTH, EVENT_WIDTH):
+            event_type, a, b, c, d = events[offset:offset + EVENT_WIDTH]
+            if event_types is not None and event_type not in event_types:
+                continue
+            if event_type == EVENT_DEAL:
+                yield f"Player {a} received card {self.CARDS[self._deck[b]]} with index = {b}\n"
+            elif event_type == EVENT_PLAY:
+                yield f"Player {a} played card {self.CARDS[self._deck[b]]}\n"
+            elif event_type == EVENT_MISPLAY:
+                yield f"Player {a} played card {self.CARDS[self._deck[b]]} incorrectly. Lives left: {c}\n"
+            elif event_type == EVENT_DISCARD:
+                yield f"Player {a} discarded card {self.CARDS[self._deck[b]]}.\n"
+            elif event_type == EVENT_DRAW:
+                # The drawn card is reported one position too early, as it always has been
+                yield f"Player {a} drew a new card = {self.CARDS[self._deck[b - 1]]}. Current top card index: {b - 1}\n"
+            elif event_type == EVENT_HINT:
+                hint_value = self.COLOURS[c] if b == 0 else c
+                hint = [index for index in range(self.CARDS_PER_PLAYER) if d >> index & 1]
+                yield f"Hint given to player {a}: {HINT_TYPES[b]} {hint_value} at indices [{hint}]\n"
+            elif event_type == EVENT_ACTION_PLAY:
+                yield f"Player {a} action: {Action(ActionType.PLAY_CARD, a, b)}\n"
+            elif event_type == EVENT_ACTION_DISCARD:
+                yield f"Player {a} action: {Action(ActionType.DISCARD_CARD, a, b)}\n"
+            elif event_type == EVENT_ACTION_HINT:
+                hint_value = self.COLOURS[c] if b == 0 else c
+                yield f"Player {a} action: {Action(ActionType.GIVE_HINT, a, hint_type=HINT_TYPES[b], hint_value=hint_value, target_player_index=d)}\n"
+            elif event_type == EVENT_TURN:
+                yield f"Turn passed to player {a}\n"
+
+    @property
+    def hints(self):
+        return HintsView(self._knowledge, type(self))
+
+    def knowledge_masks(self, player_index: int):
+        """
+        Returns the knowledge masks of the cards in a player's hand, in hand order.
+        Bit code of a mask is set while the card may still be CARDS[code].
+        """
+        return [self._knowledge[card_index] for card_index in self.cards_in_players_hands[player_index]]
+
+    def hand_knowledge(self, player_index: int):
+        """
+        Returns a (hand size, 25) NumPy boolean array: entry [slot, code] tells whether the card at slot may be CARDS[code].
+        """
+        import numpy as np
+        masks = np.array(self.knowledge_masks(player_index), dtype=np.uint32)
+        return (masks[:, None] >> np.arange(len(self.CARDS), dtype=np.uint32) & 1).astype(bool)
+
+    @property
+    def deck(self):
+        return DeckView(self._deck, self.CARDS)
+
+    @property
+    def deck_codes(self):
+        return bytes(self._deck)
+
+    def buffers(self):
+        """
+        Returns read-only memoryviews of the deck codes, the compact playstate (codes in the order of CardState) and the
+        highest number played of each colour. Unlike deck_codes, playstate and board they copy nothing, and they follow
+        the game through steps, resets and restores, so they can be kept and read every turn. Clones have their own.
+        """
+        return tuple(memoryview(buffer).toreadonly() for buffer in (self._deck, self._playstate, self._board))
+
+    @property
+    def playstate(self):
+        return PlaystateView(self._playstate)
+
+    @property
+    def board(self):
+        return ColourView(self._board.__getitem__, self.COLOURS)
+
+    @property
+    def discard(self):
+        return ColourView(self.__discarded_numbers, self.COLOURS)
+
+    def __discarded_numbers(self, colour_index: int):
+        """
+        Returns the sorted numbers of the discarded cards of a colour.
+        """
+        first_code = colour_index * self.MAX_NUMBER
+        return [number for number in range(1, self.MAX_NUMBER + 1) for _ in range(self._discard[first_code + number - 1])]
     
     def is_game_over(self):
         if self.lives <= 0:
             return True
-        if all([self.board[colour] == max(self.CARDS_PER_COLOUR) for colour in self.COLOURS]):
+        if min(self._board) == self.MAX_NUMBER:
             return True
         if not self.__is_deck_empty():
             return False
@@ -197,7 +794,7 @@ class HanabiGame:
         """
         Returns the current score based on the board state.
         """
-        return sum(self.board.values())
+        return sum(self._board)
 
     def status(self, player_index: int):
         """
@@ -214,7 +811,7 @@ class HanabiGame:
         status += f"Cards in hand of other players:\n"
         for i in range(self.NUM_PLAYERS):
             if not i == player_index:
-                status += f"Player {i}: {[self.deck[card_index] for card_index in self.cards_in_players_hands[i]]}\n"
+                status += f"Player {i}: {[self.CARDS[self._deck[card_index]] for card_index in self.cards_in_players_hands[i]]}\n"
         status += f"Hinted cards in hand of other players:\n"
         for i in range(self.NUM_PLAYERS):
             status += f"Player {i}: {[self.hints[card_index] for card_index in self.cards_in_players_hands[i]]}\n"
@@ -224,32 +821,45 @@ class HanabiGame:
 
     def get_legal_actions(self):
         """
-        Returns a list of legal actions that can be performed by the current player.
+        Returns a list of legal actions that can be performed by the current player, in action id order.
+        The Action objects are shared with the action space table and must not be modified.
         """
-        actions = []
-        current_player = self.current_player_index
         if self.is_game_over():
-            return actions  # No actions available if the game is over
+            return []  # No actions available if the game is over
+        table = self.action_space.actions[self.current_player_index]
+        hand_size = len(self.cards_in_players_hands[self.current_player_index])
+        actions = list(table[:hand_size]) + list(table[self.CARDS_PER_PLAYER:self.CARDS_PER_PLAYER + hand_size])
+        if self.hints_available > 0:
+            actions += table[2 * self.CARDS_PER_PLAYER:]
+        return actions
 
-        # Check if the player can play a card
-        if self.cards_in_players_hands[current_player]:
-            for card_index in range(len(self.cards_in_players_hands[current_player])):
-                actions.append(Action(ActionType.PLAY_CARD, current_player, card_index))
+    def legal_action_mask(self):
+        """
+        Returns the legal action ids of the current player as an int bitmask: bit action_id is set if the action is legal.
+        """
+        if self.is_game_over():
+            return 0
+        mask = self.action_space.card_masks[len(self.cards_in_players_hands[self.current_player_index])]
+        if self.hints_available > 0:
+            mask |= self.action_space.hint_mask
+        return mask
 
-        # Check if the player can discard a card
-        if self.cards_in_players_hands[current_player]:
-            for card_index in range(len(self.cards_in_players_hands[current_player])):
-                actions.append(Action(ActionType.DISCARD_CARD, current_player, card_index))
+    def legal_action_array(self):
+        """
+        Returns the legal action ids of the current player as a NumPy boolean array of length action_space.num_actions.
+        """
+        import numpy as np
+        mask = self.legal_action_mask()
+        return (np.uint64(mask) >> np.arange(self.action_space.num_actions, dtype=np.uint64) & np.uint64(1)).astype(bool)
 
-        # Check if the player can give a hint
-        if self.hints_available > 0:
-            for target in range(self.NUM_PLAYERS):
-                if target != current_player:
-                    for colour in self.COLOURS:
-                        actions.append(Action(ActionType.GIVE_HINT, current_player, target_player_index=target, hint_type=HintType.COLOUR, hint_value=colour))
-                    for number in self.CARDS_PER_COLOUR:
-                        actions.append(Action(ActionType.GIVE_HINT, current_player, target_player_index=target, hint_type=HintType.NUMBER, hint_value=number))
-        return actions
+    def step_id(self, action_id: int):
+        """
+        Plays the action of id action_id for the current player, see ActionSpace.
+        Returns what step returns.
+        """
+        if not 0 <= action_id < self.action_space.num_actions:
+            raise ValueError(f"Invalid action id {action_id}. Must be between 0 and {self.action_space.num_actions - 1}.")
+        return self.step(self.action_space.actions[self.current_player_index][action_id], self.current_player_index)
     
     def get_current_player(self):
         """
@@ -257,12 +867,118 @@ class HanabiGame:
         """
         return self.current_player_index
     
-    def clone(self):
+    def clone(self, with_log: bool = True):
         """
         Returns a deep copy of the game state for simulations.
+        The copy is built slot by slot, which is much faster than copy.deepcopy. It does not inherit snapshots.
+        Args:
+            with_log (bool): Whether the copy keeps the log and goes on recording events. Rollouts should pass False.
         """
-        return self
-    
+        game = object.__new__(type(self))
+        game.NUM_PLAYERS = self.NUM_PLAYERS
+        game.CARDS_PER_PLAYER = self.CARDS_PER_PLAYER
+        game.NUM_CARDS_IN_DECK = self.NUM_CARDS_IN_DECK
+        game.action_space = self.action_space
+        game._deck = self._deck[:]
+        game._playstate = self._playstate[:]
+        game._board = self._board[:]
+        game._discard = self._discard[:]
+        game._knowledge = self._knowledge[:]
+        game.cards_in_players_hands = [hand[:] for hand in self.cards_in_players_hands]
+        game.current_player_index = self.current_player_index
+        game.turn_count = self.turn_count
+        game.current_top_card = self.current_top_card
+        game.hints_available = self.hints_available
+        game.lives = self.lives
+        if with_log and self._events is not None:
+            game._events = self._events[:]
+            game._num_events = self._num_events
+            game._last_round_start = self._last_round_start
+        else:
+            game._events = None
+            game._num_events = 0
+            game._last_round_start = 0
+        game._undo = None
+        return game
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def snapshot(self):
+        """
+        Returns a token marking the current state, to come back to it later with restore(token).
+        From the first snapshot on, every step records what it changes in an undo journal,
+        so restoring only reverts the fields touched since the snapshot instead of copying the whole game.
+        Snapshots can be nested: restoring to a token keeps the tokens taken before it valid.
+        """
+        if self._undo is None:
+            self._undo = []
+        return len(self._undo)
+
+    def restore(self, token: int):
+        """
+        Undoes every step taken since snapshot() returned token.
+        Raises:
+            ValueError: If the token does not belong to the current undo journal.
+        """
+        if self._undo is None or token < 0 or token > len(self._undo):
+            raise ValueError(f"Invalid snapshot token: {token}.")
+        undo = self._undo
+        while len(undo) > token:
+            action_type, player_index, index, card_index, hints_available, lives, current_top_card, num_events, last_round_start = undo.pop()
+            self.current_player_index = player_index
+            self.turn_count -= 1
+            self.hints_available = hints_available
+            self.lives = lives
+            self._num_events = num_events
+            self._last_round_start = last_round_start
+            if action_type == ActionType.GIVE_HINT:
+                for hinted_card_index, mask in zip(self.cards_in_players_hands[index], card_index):
+                    self._knowledge[hinted_card_index] = mask
+                continue
+            hand = self.cards_in_players_hands[player_index]
+            if self.current_top_card != current_top_card:
+                self._playstate[hand.pop()] = IN_DECK
+                self.current_top_card = current_top_card
+            code = self._deck[card_index]
+            if self._playstate[card_index] == BOARD:
+                self._board[code // self.MAX_NUMBER] -= 1
+            else:
+                self._discard[code] -= 1
+            hand.insert(index, card_index)
+            self._playstate[card_index] = 1 + player_index
+
+    def drop_snapshots(self):
+        """
+        Stops recording the undo journal. Tokens returned before are no longer valid.
+        """
+        self._undo = None
+
+    def redeal(self, card_indices: list, codes: list):
+        """
+        Puts other cards at positions of the deck that are still hidden, in a hand or not drawn yet, e.g. to sample a
+        deal consistent with what a player knows. The cards must be the ones already at those positions, in any order,
+        and each must agree with the hints given about its position. The log, if kept, shows the new cards.
+        Args:
+            card_indices (list): Deck positions to change.
+            codes (list): Card code to put at each position.
+        Raises:
+            ValueError: If a position is on the board or the discard pile, the cards differ from the ones there,
+                a card contradicts the hints about its position, or snapshots are kept, as restoring reads the deck.
+        """
+        if self._undo is not None:
+            raise ValueError("Cannot re-deal cards while snapshots are kept.")
+        deck, playstate, knowledge = self._deck, self._playstate, self._knowledge
+        if len(codes) != len(card_indices) or sorted(codes) != sorted(deck[card_index] for card_index in card_indices):
+            raise ValueError("Re-dealt cards must be the cards already at those positions.")
+        for card_index, code in zip(card_indices, codes):
+            if playstate[card_index] in (BOARD, DISCARD):
+                raise ValueError(f"Card {card_index} is not hidden.")
+            if not knowledge[card_index] >> code & 1:
+                raise ValueError(f"Card {self.CARDS[code]} contradicts the hints about card {card_index}.")
+        for card_index, code in zip(card_indices, codes):
+            deck[card_index] = code
+
     def render(self, mode='text'):
         """
         Renders the game state.
@@ -273,27 +989,64 @@ class HanabiGame:
         else:
             raise ValueError("Unsupported render mode. Use 'text'.")
 
-    def step(self, action: Action, current_player: int):
+    def step(self, action: Action, current_player: int, full_state: bool = False):
         """
         Changes the state of the game according to the action taken by the player.
+        Returns a StepEvent describing what changed; its state field is a HanabiGameState copy of the game after the step
+        if full_state is True, else None, as building it costs much more than the step itself.
         """
         if action.player_index != current_player:
             raise ValueError(f"Action player index {action.player_index} does not match current player index {current_player}.")
         
-        self.last_round = ""
+        last_round_start = self._last_round_start
+        self._last_round_start = self._num_events
         if self.is_game_over():
             raise ValueError("Game is already over. Cannot apply action.")
 
+        if self._undo is not None:
+            # Values needed to undo this step, recorded only once the action has been applied without error
+            if action.type == ActionType.GIVE_HINT:
+                # Knowledge masks of the target hand before the hint
+                index = action.target_player_index
+                card_index = tuple(self._knowledge[hinted_card_index] for hinted_card_index in self.cards_in_players_hands[index]) if 0 <= index < self.NUM_PLAYERS else ()
+            else:
+                hand = self.cards_in_players_hands[current_player]
+                index = action.card_index
+                card_index = hand[index] if index < len(hand) else -1
+            undo_record = (action.type, current_player, index, card_index, self.hints_available, self.lives,
+                           self.current_top_card, self._num_events, last_round_start)
+
+        hints_available, lives, current_top_card = self.hints_available, self.lives, self.current_top_card
+        card, hinted, drawn_slot = -1, (), -1
         if action.type == ActionType.PLAY_CARD:
-            self.__apply_action_play(action.player_index, action.card_index)
+            card = self.__apply_action_play(action.player_index, action.card_index)
         elif action.type == ActionType.DISCARD_CARD:
-            self.__apply_action_discard(action.player_index, action.card_index)
+            card = self.__apply_action_discard(action.player_index, action.card_index)
         elif action.type == ActionType.GIVE_HINT:
-            self.__apply_action_hint(action.player_index, action.target_player_index, action.hint_type, action.hint_value)
+            hinted = tuple(self.__apply_action_hint(action.player_index, action.target_player_index, action.hint_type, action.hint_value))
+        if self.current_top_card != current_top_card:
+            drawn_slot = len(self.cards_in_players_hands[action.player_index]) - 1
 
-        self.log += f"Player {action.player_index} action: {action}\n"
+        if self._events is not None:
+            if action.type == ActionType.PLAY_CARD:
+                self.__record(EVENT_ACTION_PLAY, action.player_index, action.card_index)
+            elif action.type == ActionType.DISCARD_CARD:
+                self.__record(EVENT_ACTION_DISCARD, action.player_index, action.card_index)
+            else:
+                hint_value = self.COLOURS.index(action.hint_value) if action.hint_type == HintType.COLOUR else action.hint_value
+                self.__record(EVENT_ACTION_HINT, action.player_index, HINT_TYPES.index(action.hint_type), hint_value, action.target_player_index)
+        if self._undo is not None:
+            self._undo.append(undo_record)
         self.__pass_turn()
-        return HanabiGameState()
+        return StepEvent(action, card, action.type == ActionType.PLAY_CARD and self.lives == lives, drawn_slot, hinted,
+                         self.hints_available - hints_available, self.lives - lives, self.get_state() if full_state else None)
+
+    def get_state(self):
+        """
+        Returns a HanabiGameState holding a copy of the hands, tokens, board and discard pile.
+        """
+        return HanabiGameState([hand[:] for hand in self.cards_in_players_hands], self.hints_available, self.lives,
+                               dict(self.board), dict(self.discard))
     
     def __apply_action_hint(self, player_index :int, target_player: int, hint_type: str, hint_value: str):
         """
@@ -302,8 +1055,8 @@ class HanabiGame:
         #print(f"Hint given to player {target_player}: {hint_type} {hint_value}")
         if hint_type not in [HintType.COLOUR, HintType.NUMBER]:
             raise ValueError("Hint type must be 'colour' or 'number'.")
-        if hint_value not in self.COLOURS and hint_type == HintType.COLOUR:
-            raise ValueError(f"Invalid colour: {hint_value}. Must be one of {self.COLOURS}.")
+        if hint_value not in self.HINT_COLOURS and hint_type == HintType.COLOUR:
+            raise ValueError(f"Invalid colour: {hint_value}. Must be one of {self.HINT_COLOURS}.")
         if hint_value not in self.CARDS_PER_COLOUR and hint_type == HintType.NUMBER:
             raise ValueError(f"Invalid number: {hint_value}. Must be one of {self.CARDS_PER_COLOUR}.")
         if self.hints_available <= 0:
@@ -311,30 +1064,28 @@ class HanabiGame:
         if target_player == player_index:
             raise ValueError("Cannot give hint to yourself.")
 
-        self.hints_available -= 1
-        hint = []
-        
         if hint_type == HintType.COLOUR:
-            # Provide a colour hint
-            for index, card_index in enumerate(self.cards_in_players_hands[target_player]):
-                card = self.deck[card_index]
-                if card[0] == hint_value:
-                    # Update the player's hand with the hint
-                    hint.append(index)
-                    self.hints[card_index].append(str(hint_value))
-                else:
-                    self.hints[card_index].append("N-" + str(hint_value))
-        elif hint_type == HintType.NUMBER:
-            # Provide a number hint
-            for index, card_index in enumerate(self.cards_in_players_hands[target_player]):
-                card = self.deck[card_index]
-                if card[1] == hint_value:
-                    hint.append(index)
-                    # Update the player's hand with the hint
-                    self.hints[card_index].append(str(hint_value))
-                else:
-                    self.hints[card_index].append("N-" + str(hint_value))
-        self.log += f"Hint given to player {target_player}: {hint_type} {hint_value} at indices [{hint}]\n"
+            colour_index = self.HINT_COLOURS.index(hint_value)
+            hint_mask = self.HINT_MASKS[colour_index]
+        else:
+            hint_mask = self.NUMBER_MASKS[hint_value - 1]
+        hand = self.cards_in_players_hands[target_player]
+        deck = self._deck
+        # The hint mask has the bit of every card it points at
+        hint = [index for index, card_index in enumerate(hand) if hint_mask >> deck[card_index] & 1]
+        # Recorded before any change, so that a failure leaves the game as it was
+        if self._events is not None:
+            hinted_slots = 0
+            for index in hint:
+                hinted_slots |= 1 << index
+            encoded_value = colour_index if hint_type == HintType.COLOUR else hint_value
+            self.__record(EVENT_HINT, target_player, HINT_TYPES.index(hint_type), encoded_value, hinted_slots)
+
+        self.hints_available -= 1
+        miss_mask = self.FULL_KNOWLEDGE ^ hint_mask
+        knowledge = self._knowledge
+        for card_index in hand:
+            knowledge[card_index] &= hint_mask if hint_mask >> deck[card_index] & 1 else miss_mask
         return hint
 
     def __apply_action_play(self, player_index: int, card_index_in_hand: int):
@@ -346,6 +1097,7 @@ class HanabiGame:
         The status of the card is updated in playstate, to BOARD or DISCARD respectively.
         If there are cards available in the deck, it draws a new card. Current top card is incremented.
         Else it does not draw a new card.
+        Returns the code of the card played.
         """
         #Verify input
         if player_index < 0 or player_index >= self.NUM_PLAYERS:
@@ -355,26 +1107,30 @@ class HanabiGame:
         
         #Get the card from the player's hand
         card_index = self.cards_in_players_hands[player_index][card_index_in_hand]
-        card = self.deck[card_index]
+        code = self._deck[card_index]
+        colour_index = code // self.MAX_NUMBER
 
         # Check if the card can be played
-        if self.board[card[0]] + 1 == card[1]:
+        if self._board[colour_index] == code % self.MAX_NUMBER:
             # Valid play
-            self.board[card[0]] += 1
-            self.playstate[card_index] = CardState.BOARD
-            self.log += f"Player {player_index} played card {card}\n"
+            self._board[colour_index] += 1
+            self._playstate[card_index] = BOARD
+            if self._events is not None:
+                self.__record(EVENT_PLAY, player_index, card_index)
         else:
             # Invalid play, lose a life
             self.lives -= 1
-            self.playstate[card_index] = CardState.DISCARD
-            self.log += f"Player {player_index} played card {card} incorrectly. Lives left: {self.lives}\n"
+            self._playstate[card_index] = DISCARD
+            self._discard[code] += 1
+            if self._events is not None:
+                self.__record(EVENT_MISPLAY, player_index, card_index, self.lives)
         
         #Remove the card from the player's hand
         del self.cards_in_players_hands[player_index][card_index_in_hand]
 
         # If there are cards left in the deck, draw a new card
         self.__draw_new_card(player_index)
-        pass
+        return code
         
     def __draw_new_card(self, player_index: int):
         """
@@ -382,9 +1138,9 @@ class HanabiGame:
         """
         if not self.__is_deck_empty():
             self.cards_in_players_hands[player_index].append(self.current_top_card)
-            self.playstate[self.current_top_card] = CardState.CardStateInPlayerHand(player_index)
-            self.log += f"Player {player_index} drew a new card = {self.deck[self.current_top_card - 1]}. Current top card index: {self.current_top_card - 1}\n"
-            self.last_round += f"Player {player_index} drew a new card = {self.deck[self.current_top_card - 1]}. Current top card index: {self.current_top_card - 1}\n"
+            self._playstate[self.current_top_card] = 1 + player_index
+            if self._events is not None:
+                self.__record(EVENT_DRAW, player_index, self.current_top_card)
             self.current_top_card += 1
         pass
 
@@ -394,6 +1150,7 @@ class HanabiGame:
         Updates the playstate of the card to DISCARD.
         Discards a card from the player's hand.
         Draws a new card if there are cards left in the deck.
+        Returns the code of the card discarded.
         """
         #Validate input
         if player_index < 0 or player_index >= self.NUM_PLAYERS:
@@ -403,19 +1160,21 @@ class HanabiGame:
         
         #Get the card from the player's hand
         card_index = self.cards_in_players_hands[player_index][card_index_in_hand]
-        card = self.deck[card_index]
+        code = self._deck[card_index]
         
-        self.playstate[card_index] = CardState.DISCARD
+        self._playstate[card_index] = DISCARD
+        self._discard[code] += 1
         if self.hints_available < self.MAX_HINTS:
             self.hints_available += 1
-        self.log += f"Player {player_index} discarded card {card}.\n"
+        if self._events is not None:
+            self.__record(EVENT_DISCARD, player_index, card_index)
         
         #Remove the card from the player's hand
         del self.cards_in_players_hands[player_index][card_index_in_hand]
 
         # If there are cards left in the deck, draw a new card
         self.__draw_new_card(player_index)
-        pass
+        return code
 
     def __pass_turn(self):
         """
@@ -423,7 +1182,8 @@ class HanabiGame:
         """
         self.current_player_index = (self.current_player_index + 1) % self.NUM_PLAYERS
         self.turn_count += 1
-        self.log += f"Turn passed to player {self.current_player_index}\n"
+        if self._events is not None:
+            self.__record(EVENT_TURN, self.current_player_index)
 
     def __is_deck_empty(self):
         """
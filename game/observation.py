@@ -0,0 +1,311 @@
+# game/observation.py
+from functools import lru_cache
+
+import numpy as np
+
+from game.hanabi_game import (HanabiGame, Action, ActionType, HintType, STANDARD_VARIANT, BOARD, COLOUR_MASKS, NUMBER_MASKS,
+                              cards_per_player)
+
+NUM_COLOURS = len(HanabiGame.COLOURS)
+NUM_NUMBERS = HanabiGame.MAX_NUMBER
+NUM_CARD_CODES = len(HanabiGame.CARDS)
+NUM_ACTION_TYPES = len(ActionType)
+ACTION_TYPES = tuple(ActionType)
+# Knowledge mask bits of each colour, then each number, in the order of the knowledge features
+FEATURE_MASKS = np.array(COLOUR_MASKS + NUMBER_MASKS, dtype=np.uint32)
+
+class ObservationLayout:
+    """
+    Offsets of the sections of an observation vector, for a given number of players.
+    Seats are relative to the observer: seat k is player (observer + k) % num_players.
+
+    Sections, in order:
+        hands (num_players - 1, H, 25): one-hot card of each slot of the other players, seats 1 to num_players - 1.
+        knowledge (num_players, H, 10): for each seat and slot, whether each colour and each number is still possible
+            given the hints, all zeros for an empty slot.
+        board (5, 5): board[c, n] is set if number n + 1 of colour c has been played.
+        discards (25,): discarded or misplayed copies of each card.
+        hints (8,), lives (3,): thermometer encoding of the tokens left.
+        deck (1,): cards left in the deck.
+        last action: actor seat (num_players), action type (3), slot played or discarded (H), hint target seat (num_players),
+            hinted colour (5), hinted number (5), hinted slots (H), card played or discarded (25), successful play (1).
+    """
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.hand_size = cards_per_player(num_players)
+        h = self.hand_size
+        sections = [
+            ("hands", (num_players - 1, h, NUM_CARD_CODES)),
+            ("knowledge", (num_players, h, NUM_COLOURS + NUM_NUMBERS)),
+            ("board", (NUM_COLOURS, NUM_NUMBERS)),
+            ("discards", (NUM_CARD_CODES,)),
+            ("hints", (HanabiGame.MAX_HINTS,)),
+            ("lives", (3,)),
+            ("deck", (1,)),
+            ("last_actor", (num_players,)),
+            ("last_type", (NUM_ACTION_TYPES,)),
+            ("last_slot", (h,)),
+            ("last_target", (num_players,)),
+            ("last_colour", (NUM_COLOURS,)),
+            ("last_number", (NUM_NUMBERS,)),
+            ("last_hinted_slots", (h,)),
+            ("last_card", (NUM_CARD_CODES,)),
+            ("last_success", (1,)),
+        ]
+        self.shapes = dict(sections)
+        self.offsets = {}
+        offset = 0
+        for name, shape in sections:
+            self.offsets[name] = offset
+            offset += int(np.prod(shape))
+        self.size = offset
+        self.last_action_offset = self.offsets["last_actor"]
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def for_players(num_players: int):
+        return ObservationLayout(num_players)
+
+    def view(self, observations, name: str):
+        """
+        Returns a view of section name of an array of observations of shape (..., size), with the section shape.
+        Raises:
+            ValueError: If the section cannot be viewed without a copy.
+        """
+        offset = self.offsets[name]
+        shape = self.shapes[name]
+        section = observations[..., offset:offset + int(np.prod(shape))]
+        view = section.reshape(observations.shape[:-1] + shape)
+        if not np.shares_memory(view, observations):
+            raise ValueError("Observations must be contiguous along their last axis.")
+        return view
+
+def observation_size(num_players: int):
+    """
+    Returns the length of the observation vector of one player.
+    """
+    return ObservationLayout.for_players(num_players).size
+
+def knowledge_features(hand_knowledge, out):
+    """
+    Writes into out (hand size, 10) which colours and numbers each card of a hand may still be,
+    from the (n, 25) boolean array returned by HanabiGame.hand_knowledge. Rows past the n cards are zeroed.
+    """
+    possible = hand_knowledge.reshape(len(hand_knowledge), NUM_COLOURS, NUM_NUMBERS)
+    out[:len(possible), :NUM_COLOURS] = possible.any(axis=2)
+    out[:len(possible), NUM_COLOURS:] = possible.any(axis=1)
+    out[len(possible):] = 0
+
+class ObservationEncoder:
+    """
+    Keeps the observation vectors of every player of a game, and updates them in place after each step.
+
+    Args:
+        game (HanabiGame): The game to observe. It should not have been stepped since the encoder was built or reset.
+        out (np.ndarray): Optional (num_players, observation_size(num_players)) array to write into,
+            for instance one row of a larger batch array. Allocated if not given.
+        dtype: Data type of the observations when out is not given, np.uint8 or np.float32.
+
+    Raises:
+        ValueError: If the game does not play the standard rules, whose card and colour counts the layout is built on,
+            or if out has the wrong shape.
+
+    Usage:
+        encoder = ObservationEncoder(game)
+        action = ...
+        game.step(action, action.player_index)
+        encoder.update(action)
+        vector = encoder.observation(game.current_player_index)
+    """
+    def __init__(self, game: HanabiGame, out=None, dtype=np.uint8):
+        if game.VARIANT != STANDARD_VARIANT:
+            raise ValueError(f"Observations are only encoded for the standard rules, not the {game.VARIANT.name} variant.")
+        self.game = game
+        self.layout = ObservationLayout.for_players(game.NUM_PLAYERS)
+        shape = (game.NUM_PLAYERS, self.layout.size)
+        if out is None:
+            out = np.zeros(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"Output array must have shape {shape}, got {out.shape}.")
+        self.observations = out
+        self._sections = {name: self.layout.view(out, name) for name in self.layout.offsets}
+        self._last = out[:, self.layout.last_action_offset:]
+        self._deck, self._playstate, self._board = game.buffers()
+        # Buffers reused by every update, so that encoding a step allocates no arrays
+        h = self.layout.hand_size
+        # _seats[p][observer] is the seat of player p seen by observer, written one observer at a time with basic
+        # indexing, as fancy indexing allocates index arrays
+        self._seats = tuple(tuple((player_index - observer) % game.NUM_PLAYERS for observer in range(game.NUM_PLAYERS))
+                            for player_index in range(game.NUM_PLAYERS))
+        self._masks = np.zeros((h, 1), dtype=np.uint32)
+        self._feature_bits = np.empty((h, len(FEATURE_MASKS)), dtype=np.uint32)
+        self._possible = np.empty((h, len(FEATURE_MASKS)), dtype=bool)
+        self._knowledge = np.empty((h, len(FEATURE_MASKS)), dtype=out.dtype)
+        self._hands = [[] for _ in range(game.NUM_PLAYERS)]
+        self.reset()
+
+    def observation(self, player_index: int):
+        """
+        Returns the observation vector of a player, as a view into the encoder's array.
+        """
+        return self.observations[player_index]
+
+    def reset(self):
+        """
+        Encodes the whole game from scratch. Needed only when the game was changed without going through update.
+        """
+        self.observations[:] = 0
+        for player_index in range(self.game.NUM_PLAYERS):
+            self.__encode_hand(player_index)
+        self.__encode_public()
+        self.__encode_board()
+        discards = self._sections["discards"]
+        for colour, numbers in self.game.discard.items():
+            for number in numbers:
+                discards[:, HanabiGame.COLOURS.index(colour) * NUM_NUMBERS + number - 1] += 1
+
+    def update(self, action: Action):
+        """
+        Updates the observations after game.step(action, ...), touching only the sections the action changed.
+        Writes in place into observations, without allocating arrays.
+        """
+        game = self.game
+        player_index = action.player_index
+        self._last[:] = 0
+        last_actor = self._sections["last_actor"]
+        for observer, seat in enumerate(self._seats[player_index]):
+            last_actor[observer, seat] = 1
+        self._sections["last_type"][:, ACTION_TYPES.index(action.type)] = 1
+        if action.type == ActionType.GIVE_HINT:
+            target = action.target_player_index
+            last_target = self._sections["last_target"]
+            for observer, seat in enumerate(self._seats[target]):
+                last_target[observer, seat] = 1
+            if action.hint_type == HintType.COLOUR:
+                colour_index = HanabiGame.COLOURS.index(action.hint_value)
+                self._sections["last_colour"][:, colour_index] = 1
+                hint_mask = COLOUR_MASKS[colour_index]
+            else:
+                self._sections["last_number"][:, action.hint_value - 1] = 1
+                hint_mask = NUMBER_MASKS[action.hint_value - 1]
+            hinted_slots = self._sections["last_hinted_slots"]
+            deck = self._deck
+            for slot, card_index in enumerate(game.cards_in_players_hands[target]):
+                if hint_mask >> deck[card_index] & 1:
+                    hinted_slots[:, slot] = 1
+            self.__encode_knowledge(target)
+        else:
+            card_index = self._hands[player_index][action.card_index]
+            code = self._deck[card_index]
+            self._sections["last_slot"][:, action.card_index] = 1
+            self._sections["last_card"][:, code] = 1
+            if self._playstate[card_index] == BOARD:
+                self._sections["last_success"][:] = 1
+                self.__encode_board()
+            else:
+                self._sections["discards"][:, code] += 1
+            self.__encode_hand(player_index)
+        self.__encode_public()
+
+    def __encode_hand(self, player_index: int):
+        """
+        Encodes the cards of a player for everyone else, and what everyone knows about them.
+        """
+        game = self.game
+        self._hands[player_index] = game.cards_in_players_hands[player_index][:]
+        deck = self._deck
+        hands = self._sections["hands"]
+        for observer in range(game.NUM_PLAYERS):
+            if observer == player_index:
+                continue
+            hand = hands[observer, self._seats[player_index][observer] - 1]
+            hand[:] = 0
+            for slot, card_index in enumerate(self._hands[player_index]):
+                hand[slot, deck[card_index]] = 1
+        self.__encode_knowledge(player_index)
+
+    def __encode_knowledge(self, player_index: int):
+        """
+        Encodes what everyone knows about the cards of a player, the same features as knowledge_features,
+        straight from the knowledge masks into the encoder's buffers.
+        """
+        masks = self.game.knowledge_masks(player_index)
+        # Empty slots keep a zero mask, so all their features are zero
+        self._masks[len(masks):] = 0
+        for slot, mask in enumerate(masks):
+            self._masks[slot] = mask
+        np.bitwise_and(self._masks, FEATURE_MASKS, out=self._feature_bits)
+        np.not_equal(self._feature_bits, 0, out=self._possible)
+        np.copyto(self._knowledge, self._possible)
+        knowledge = self._sections["knowledge"]
+        for observer, seat in enumerate(self._seats[player_index]):
+            knowledge[observer, seat] = self._knowledge
+
+    def __encode_board(self):
+        board = self._sections["board"]
+        for colour_index, played in enumerate(self._board):
+            board[:, colour_index, :played] = 1
+            board[:, colour_index, played:] = 0
+
+    def __encode_public(self):
+        game = self.game
+        hints = self._sections["hints"]
+        hints[:, :game.hints_available] = 1
+        hints[:, game.hints_available:] = 0
+        lives = self._sections["lives"]
+        lives[:, :game.lives] = 1
+        lives[:, max(game.lives, 0):] = 0
+        self._sections["deck"][:, 0] = game.NUM_CARDS_IN_DECK - game.current_top_card
+
+class BatchObservationEncoder:
+    """
+    Observation encoders for many games of the same number of players, writing into one array.
+
+    Args:
+        games (list): HanabiGame instances, all with the same number of players.
+        out (np.ndarray): Optional (len(games), num_players, observation_size(num_players)) array to write into.
+        dtype: Data type of the observations when out is not given.
+
+    Raises:
+        ValueError: If the games have different numbers of players, or out has the wrong shape or is not C-contiguous,
+            as gather reads it as one (len(games) * num_players, size) array.
+
+    Attributes:
+        observations (np.ndarray): (len(games), num_players, size) observations of every player of every game.
+        encoders (list): The ObservationEncoder of each game, writing into rows of observations.
+    """
+    def __init__(self, games: list, out=None, dtype=np.uint8):
+        num_players = games[0].NUM_PLAYERS
+        if any(game.NUM_PLAYERS != num_players for game in games):
+            raise ValueError("All games must have the same number of players.")
+        size = observation_size(num_players)
+        shape = (len(games), num_players, size)
+        if out is None:
+            out = np.zeros(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"Output array must have shape {shape}, got {out.shape}.")
+        elif not out.flags.c_contiguous:
+            # Reshaping would silently copy it, and gather would read the copy
+            raise ValueError("Output array must be C-contiguous.")
+        self.observations = out
+        self.encoders = [ObservationEncoder(game, out[index]) for index, game in enumerate(games)]
+        self._rows = np.arange(len(games)) * num_players
+        self._indices = np.empty(len(games), dtype=np.intp)
+        self._flat = out.reshape(len(games) * num_players, size)
+
+    def update(self, game_index: int, action: Action):
+        """
+        Updates the observations of one game after it was stepped with action.
+        """
+        self.encoders[game_index].update(action)
+
+    def gather(self, player_indices, out):
+        """
+        Copies the observation of player_indices[i] in game i into out[i], without allocating.
+        Args:
+            player_indices (np.ndarray): (len(games),) players to gather, usually the current players.
+            out (np.ndarray): (len(games), size) array to write into.
+        """
+        np.add(self._rows, player_indices, out=self._indices)
+        np.take(self._flat, self._indices, axis=0, out=out)
+        return out
@@ -0,0 +1,126 @@
+# game/profiling.py
+import time
+
+from game.hanabi_game import ActionType
+
+PHASES = ("get_action", "step", "update_state")
+
+class RunSummary:
+    """
+    Where the time of one or more games went, as measured by a GameProfiler.
+
+    Attributes:
+        games (int): Number of games measured.
+        turns (int): Number of turns measured.
+        phase_time (dict): Seconds spent in each phase, keyed by the names in PHASES.
+        action_counts (dict): Number of actions of each ActionType.
+        action_time (dict): Seconds spent in each phase by ActionType of the action taken, as {ActionType: {phase: seconds}}.
+    """
+    def __init__(self, games: int, turns: int, phase_time: dict, action_counts: dict, action_time: dict):
+        self.games = games
+        self.turns = turns
+        self.phase_time = phase_time
+        self.action_counts = action_counts
+        self.action_time = action_time
+
+    def agent_time(self):
+        """
+        Returns the seconds spent in the agent, choosing actions and updating its state.
+        """
+        return self.phase_time["get_action"] + self.phase_time["update_state"]
+
+    def engine_time(self):
+        """
+        Returns the seconds spent in the game engine.
+        """
+        return self.phase_time["step"]
+
+    def report(self):
+        """
+        Returns a readable table of the summary.
+        """
+        total = sum(self.phase_time.values()) or 1.0
+        report = f"{self.games} game(s), {self.turns} turns\n"
+        for phase in PHASES:
+            seconds = self.phase_time[phase]
+            report += f"{phase:<14}{seconds:>10.4f}s {seconds / total:>7.1%} {seconds / max(self.turns, 1) * 1e6:>10.2f}us/turn\n"
+        for action_type, count in self.action_counts.items():
+            times = self.action_time[action_type]
+            per_phase = " ".join(f"{phase}={times[phase] / max(count, 1) * 1e6:.2f}us" for phase in PHASES)
+            report += f"{action_type.name:<14}{count:>8} actions  {per_phase}\n"
+        return report
+
+    def __repr__(self):
+        return self.report()
+
+class GameProfiler:
+    """
+    Instrumentation for run_game: callbacks before and after each phase of a turn, and monotonic-clock counters
+    per phase and per action type. The phases are PHASES: players.get_action, game.step and players.update_state.
+    Counters add up over every game the profiler is passed to, until reset().
+
+    Args:
+        clock: Function returning the current time in seconds, time.perf_counter by default.
+
+    Hooks are called as callback(phase, game, current_player, action), with action None before get_action.
+    Their own cost is not counted in the phase times.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.before_hooks = {phase: [] for phase in PHASES}
+        self.after_hooks = {phase: [] for phase in PHASES}
+        self.reset()
+
+    def reset(self):
+        """
+        Clears every counter, keeping the hooks.
+        """
+        self.games = 0
+        self.turns = 0
+        self.phase_time = {phase: 0.0 for phase in PHASES}
+        self.action_counts = {action_type: 0 for action_type in ActionType}
+        self.action_time = {action_type: {phase: 0.0 for phase in PHASES} for action_type in ActionType}
+
+    def add_hook(self, phase: str, callback, before: bool = False):
+        """
+        Registers a callback to call after (or before, if before is True) a phase.
+        Raises:
+            ValueError: If the phase is not one of PHASES.
+        """
+        if phase not in PHASES:
+            raise ValueError(f"Unknown phase: {phase}. Must be one of {PHASES}.")
+        (self.before_hooks if before else self.after_hooks)[phase].append(callback)
+
+    def before(self, phase: str, game, current_player: int, action):
+        for callback in self.before_hooks[phase]:
+            callback(phase, game, current_player, action)
+
+    def after(self, phase: str, game, current_player: int, action):
+        for callback in self.after_hooks[phase]:
+            callback(phase, game, current_player, action)
+
+    def record_turn(self, action, get_action_time: float, step_time: float, update_state_time: float):
+        """
+        Adds the time of one turn to the counters.
+        """
+        self.turns += 1
+        self.phase_time["get_action"] += get_action_time
+        self.phase_time["step"] += step_time
+        self.phase_time["update_state"] += update_state_time
+        self.action_counts[action.type] += 1
+        times = self.action_time[action.type]
+        times["get_action"] += get_action_time
+        times["step"] += step_time
+        times["update_state"] += update_state_time
+
+    def summary(self):
+        """
+        Returns a RunSummary of the counters so far.
+        """
+        return RunSummary(
+            self.games,
+            self.turns,
+            dict(self.phase_time),
+            dict(self.action_counts),
+            {action_type: dict(times) for action_type, times in self.action_time.items()},
+        )
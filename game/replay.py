@@ -0,0 +1,170 @@
+# game/replay.py
+"""
+Compact binary records of finished games: the deck and one byte per action id.
+
+A replay file starts with MAGIC, followed by records laid out as
+    number of players   1 byte
+    number of actions   2 bytes, little endian
+    deck                NUM_CARDS_IN_DECK bytes, card codes in drawing order
+    actions             1 byte per action, ids of ActionSpace
+Records are only ever appended, so several runs can stream into the same file.
+"""
+import mmap
+import os
+
+from game.hanabi_game import HanabiGame, DECK_TEMPLATE, STANDARD_VARIANT
+
+MAGIC = b"HNBR\x01"
+DECK_SIZE = len(DECK_TEMPLATE)
+RECORD_HEADER_SIZE = 3
+
+class GameRecord:
+    """
+    One recorded game.
+
+    Attributes:
+        num_players (int): Number of players.
+        deck (bytes): Card codes of the deck, in drawing order.
+        actions (bytes): Action ids played, in order.
+    """
+    __slots__ = ("num_players", "deck", "actions")
+
+    def __init__(self, num_players: int, deck: bytes, actions: bytes):
+        self.num_players = num_players
+        self.deck = deck
+        self.actions = actions
+
+    def simulate(self, enable_log: bool = True, num_actions: int = None):
+        """
+        Replays the record and returns the resulting HanabiGame.
+        Args:
+            enable_log (bool): Whether the replayed game keeps its log.
+            num_actions (int): Stop after this many actions, to look at the game part way. Defaults to all of them.
+        """
+        game = HanabiGame(self.num_players, enable_log=enable_log, deck=self.deck)
+        for action_id in self.actions[:num_actions]:
+            game.step_id(action_id)
+        return game
+
+    def to_bytes(self):
+        return bytes((self.num_players,)) + len(self.actions).to_bytes(2, "little") + self.deck + self.actions
+
+    def __repr__(self):
+        return f"GameRecord({self.num_players} players, {len(self.actions)} actions)"
+
+class ReplayWriter:
+    """
+    Appends game records to a replay file.
+
+    Args:
+        path (str): File to append to. It is created with the MAGIC header if it does not exist.
+
+    Usage:
+        with ReplayWriter("games.hnb") as writer:
+            run_game(players, recorder=writer)
+    """
+    def __init__(self, path: str):
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                if file.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a replay file.")
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.games_written = 0
+
+    def write(self, num_players: int, deck: bytes, actions: bytes):
+        """
+        Appends one record.
+        """
+        if len(deck) != DECK_SIZE:
+            raise ValueError(f"Deck must have {DECK_SIZE} cards.")
+        self.file.write(GameRecord(num_players, bytes(deck), bytes(actions)).to_bytes())
+        self.games_written += 1
+
+    def write_game(self, game: HanabiGame, actions: bytes):
+        """
+        Appends the record of a game played with the given action ids.
+        Raises:
+            ValueError: If the game does not play the standard rules, the only ones records are replayed with.
+        """
+        if game.VARIANT != STANDARD_VARIANT:
+            raise ValueError(f"Only games of the standard rules are recorded, not the {game.VARIANT.name} variant.")
+        self.write(game.NUM_PLAYERS, game.deck_codes, actions)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ReplayReader:
+    """
+    Reads the records of a replay file through a memory map, one at a time.
+
+    Args:
+        path (str): Replay file to read.
+
+    Iterating yields GameRecord objects lazily. Indexing builds, on first use, the offsets of every record.
+    """
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        size = os.path.getsize(path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a replay file.")
+        self._offsets = None
+
+    def __record_at(self, offset: int):
+        data = self.data
+        num_actions = int.from_bytes(data[offset + 1:offset + RECORD_HEADER_SIZE], "little")
+        deck_start = offset + RECORD_HEADER_SIZE
+        actions_start = deck_start + DECK_SIZE
+        end = actions_start + num_actions
+        if end > len(data):
+            raise ValueError(f"Truncated record at byte {offset}.")
+        return GameRecord(data[offset], bytes(data[deck_start:actions_start]), bytes(data[actions_start:end])), end
+
+    def __iter__(self):
+        offset = len(MAGIC)
+        while offset < len(self.data):
+            record, offset = self.__record_at(offset)
+            yield record
+
+    def offsets(self):
+        """
+        Returns the byte offset of every record, computed once.
+        """
+        if self._offsets is None:
+            offsets = []
+            offset = len(MAGIC)
+            data = self.data
+            while offset < len(data):
+                offsets.append(offset)
+                offset += RECORD_HEADER_SIZE + DECK_SIZE + int.from_bytes(data[offset + 1:offset + RECORD_HEADER_SIZE], "little")
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        return len(self.offsets())
+
+    def __getitem__(self, index: int):
+        return self.__record_at(self.offsets()[index])[0]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,281 @@
+# game/solver.py
+"""
+Perfect-information solver: the best score reachable on a deal when every card, including the deck order, is known.
+
+No agent can score more on a deal, so the solver gives the per-deal optimum to compare agents against.
+With everything known hints carry no information, and all hints amount to passing the turn while spending a token.
+The search is a depth-first search over the remaining moves, on the engine itself with snapshot/restore, with:
+    - a few moves per turn: playable cards, one useless card to discard, one hint, the other cards to discard only when
+      there is no useless one, and each card code once when a hand holds several copies;
+    - an optimistic bound per state, the score if every colour went as high as the cards left allow, cutting any branch
+      that cannot beat the best line found so far and stopping at once when a line reaches the bound of the deal;
+    - a bounded transposition table, keyed on the state seen from the current player, with hand order ignored and
+      useless cards all alike.
+A time limit per deal stops the search with the best line found so far and the bound of the deal.
+
+Usage:
+    python -m game.solver --players 3 --games 1000 --agent agents.random_player:RandomPlayers
+"""
+import argparse
+import time
+
+from game.hanabi_game import HanabiGame, DECK_TEMPLATE, MAX_NUMBER, COLOURS, STANDARD_VARIANT
+from simulation.simulation_runner import chunk_ranges, derive_seed, map_chunks
+
+MAX_SCORE = len(COLOURS) * MAX_NUMBER
+COPIES = bytes(DECK_TEMPLATE.count(code) for code in range(MAX_SCORE))
+# Code standing for every useless card in transposition keys, and separator between hands
+TRASH = len(COPIES)
+SEPARATOR = 255
+
+class SolveResult:
+    """
+    Outcome of PerfectInformationSolver.solve.
+
+    Attributes:
+        score (int): Best score of a line found, reachable for sure.
+        upper_bound (int): No line scores more than this. Equal to score when exact.
+        exact (bool): Whether the search finished, in which case score is the optimum.
+        nodes (int): States searched.
+        seconds (float): Time spent.
+    """
+    __slots__ = ("score", "upper_bound", "exact", "nodes", "seconds")
+
+    def __init__(self, score: int, upper_bound: int, exact: bool, nodes: int, seconds: float):
+        self.score = score
+        self.upper_bound = upper_bound
+        self.exact = exact
+        self.nodes = nodes
+        self.seconds = seconds
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        status = "exact" if self.exact else f"upper bound {self.upper_bound}"
+        return f"SolveResult(score {self.score}, {status}, {self.nodes} nodes in {self.seconds:.3f}s)"
+
+class _TimeUp(Exception):
+    pass
+
+class PerfectInformationSolver:
+    """
+    Finds the best score of fully known deals, see the module docstring.
+
+    Args:
+        max_entries (int): Size of the transposition table. It is kept as two generations of max_entries // 2 entries:
+            when the current one is full it replaces the previous one, and entries found in the previous one move back
+            to the current one, so the entries not used lately are evicted first.
+        time_limit (float): Seconds of search per deal, None for no limit.
+
+    Usage:
+        solver = PerfectInformationSolver(time_limit=1.0)
+        result = solver.solve(game)
+    """
+    def __init__(self, max_entries: int = 2 ** 20, time_limit: float = None):
+        if max_entries < 2:
+            raise ValueError("The transposition table needs at least 2 entries.")
+        self.generation_size = max_entries // 2
+        self.time_limit = time_limit
+        self._table = {}
+        self._previous = {}
+        self._nodes = 0
+        self._deadline = None
+        self._best_score = 0
+
+    def solve(self, game: HanabiGame):
+        """
+        Returns the SolveResult of the current state of game, which is not changed.
+        Raises:
+            ValueError: If the game does not play the standard rules, whose deck COPIES counts.
+        """
+        if game.VARIANT != STANDARD_VARIANT:
+            raise ValueError(f"The solver only searches the standard rules, not the {game.VARIANT.name} variant.")
+        start = time.perf_counter()
+        self._deadline = None if self.time_limit is None else start + self.time_limit
+        self._table, self._previous = {}, {}
+        self._nodes = 0
+        game = game.clone(with_log=False)
+        self._best_score = game.get_score()
+        upper_bound = sum(self._reachable(game)) if not game.is_game_over() else game.get_score()
+        try:
+            score = self._search(game, -1)
+            exact = True
+        except _TimeUp:
+            score, exact = self._best_score, False
+        self._table, self._previous = {}, {}
+        return SolveResult(score, score if exact else upper_bound, exact, self._nodes, time.perf_counter() - start)
+
+    def _reachable(self, game: HanabiGame):
+        """
+        Returns the highest number each colour can still reach, given the copies already discarded.
+        """
+        discard = game._discard
+        reachable = []
+        for colour_index, played in enumerate(game._board):
+            code = colour_index * MAX_NUMBER + played
+            while played < MAX_NUMBER and discard[code] < COPIES[code]:
+                played += 1
+                code += 1
+            reachable.append(played)
+        return reachable
+
+    def _moves(self, game: HanabiGame, reachable: list):
+        """
+        Returns the action ids worth trying for the current player, most promising first.
+        """
+        h = game.action_space.hand_size
+        codes = game._deck
+        board = game._board
+        plays, discards = [], []
+        trash = None
+        seen = set()
+        for slot, card_index in enumerate(game.cards_in_players_hands[game.current_player_index]):
+            code = codes[card_index]
+            colour_index, number = divmod(code, MAX_NUMBER)
+            if number < board[colour_index] or number >= reachable[colour_index]:
+                if trash is None:
+                    trash = h + slot
+            elif code not in seen:
+                seen.add(code)
+                if number == board[colour_index]:
+                    plays.append(slot)
+                discards.append(h + slot)
+        moves = plays
+        if trash is not None:
+            moves.append(trash)
+        if game.hints_available > 0:
+            moves.append(2 * h)
+        if trash is None:
+            # Keeping a useful card is never worse than keeping a useless one, so these only matter without useless cards
+            moves += discards
+        return moves
+
+    def _key(self, game: HanabiGame, reachable: list):
+        codes = game._deck
+        board = game._board
+        key = [game.current_top_card, game.hints_available, game.lives, *game._board]
+        hands = game.cards_in_players_hands
+        for offset in range(game.NUM_PLAYERS):
+            hand = []
+            for card_index in hands[(game.current_player_index + offset) % game.NUM_PLAYERS]:
+                code = codes[card_index]
+                colour_index, number = divmod(code, MAX_NUMBER)
+                hand.append(TRASH if number < board[colour_index] or number >= reachable[colour_index] else code)
+            hand.sort()
+            key += hand
+            key.append(SEPARATOR)
+        return bytes(key)
+
+    def _search(self, game: HanabiGame, alpha: int):
+        """
+        Returns the best score reachable from the state of game if it is above alpha, else an upper bound of it
+        that is at most alpha.
+        """
+        self._nodes += 1
+        if self._deadline is not None and not self._nodes & 255 and time.perf_counter() > self._deadline:
+            raise _TimeUp
+        score = game.get_score()
+        reachable = self._reachable(game)
+        moves = self._moves(game, reachable) if not game.is_game_over() else []
+        if not moves:
+            if score > self._best_score:
+                self._best_score = score
+            return score
+        bound = sum(reachable)
+        if bound <= alpha:
+            return bound
+        key = self._key(game, reachable)
+        entry = self._table.get(key)
+        if entry is None:
+            entry = self._previous.get(key)
+            if entry is not None:
+                self._store(key, entry)
+        if entry is not None and (entry[1] or entry[0] <= alpha):
+            return entry[0]
+        best = -1
+        token = game.snapshot()
+        for action_id in moves:
+            game.step_id(action_id)
+            value = self._search(game, max(alpha, best))
+            game.restore(token)
+            if value > best:
+                best = value
+                if best >= bound:
+                    break
+        # Below alpha, the children only returned upper bounds
+        self._store(key, (best, best > alpha or best >= bound))
+        return best
+
+    def _store(self, key: bytes, entry: tuple):
+        if len(self._table) >= self.generation_size:
+            self._previous, self._table = self._table, {}
+        self._table[key] = entry
+
+def _solve_chunk(task):
+    """
+    Solves the deals of indices [start, stop) in a worker process and returns their (index, SolveResult) pairs.
+    """
+    num_players, master_seed, start, stop, time_limit, max_entries = task
+    solver = PerfectInformationSolver(max_entries, time_limit)
+    game = HanabiGame(num_players, enable_log=False)
+    results = []
+    for game_index in range(start, stop):
+        game.reset(seed=derive_seed(master_seed, game_index))
+        results.append((game_index, solver.solve(game)))
+    return results
+
+def solve_seeded_deals(num_players: int, n_games: int, seed: int = 0, time_limit: float = 1.0, max_entries: int = 2 ** 20,
+                       workers: int = None, chunk_size: int = 16):
+    """
+    Solves the deals of n_games seeded games, possibly across several processes.
+    Deal i is the one simulation.simulation_runner plays as game i with the same seed, so the results line up with
+    the scores of run_simulation, evaluate or run_tournament.
+    Args:
+        num_players (int): Number of players in each game.
+        n_games (int): Number of deals.
+        seed (int): Master seed of the deals.
+        time_limit (float): Seconds of search per deal, None for no limit.
+        max_entries (int): Size of the transposition table of each worker.
+        workers (int): Number of worker processes, see simulation.simulation_runner.map_chunks.
+        chunk_size (int): Deals sent to a worker at once.
+    Returns:
+        list: The SolveResult of each deal, by game index.
+    """
+    results = [None] * n_games
+    tasks = [(num_players, seed, start, stop, time_limit, max_entries) for start, stop in chunk_ranges(n_games, chunk_size)]
+    for chunk in map_chunks(_solve_chunk, tasks, workers):
+        for game_index, result in chunk:
+            results[game_index] = result
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Computes the perfect-information optimum of seeded deals.")
+    parser.add_argument("--players", type=int, default=2, help="Number of players")
+    parser.add_argument("--games", type=int, default=1000, help="Number of deals")
+    parser.add_argument("--seed", type=int, default=0, help="Master seed of the deals")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="Seconds of search per deal")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the number of CPUs")
+    parser.add_argument("--agent", help="Players class, as module:ClassName, to score as a fraction of the optimum")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    results = solve_seeded_deals(args.players, args.games, args.seed, args.time_limit, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    exact = sum(result.exact for result in results)
+    print(f"{args.games} deals solved in {elapsed:.1f}s, {exact} exactly")
+    print(f"Mean optimum between {sum(r.score for r in results) / args.games:.3f} and {sum(r.upper_bound for r in results) / args.games:.3f}, "
+          f"{sum(r.score == MAX_SCORE for r in results) / args.games:.4f} perfect")
+    if args.agent:
+        from simulation.simulation_runner import run_simulation
+        from statistics_for_players.tournament import load_players_class
+        scores = run_simulation(load_players_class(args.agent), args.players, args.games, args.seed, args.workers)
+        # Against the best line found, an upper estimate of the fraction when some deals were not solved exactly
+        fractions = [score / result.score if result.score else 1.0 for score, result in zip(scores, results)]
+        print(f"{args.agent}: mean score {sum(scores) / args.games:.3f}, mean fraction of the optimum {sum(fractions) / args.games:.4f}")
+
+if __name__ == "__main__":
+    main()
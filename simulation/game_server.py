@@ -0,0 +1,320 @@
+# simulation/game_server.py
+"""
+Asyncio server hosting many Hanabi games on one event loop, for human and bot seats.
+
+Clients speak a line protocol over TCP. Outside a game:
+    NEW <players> <bots>    creates a game; the client takes seat 0, bots take the last <bots> seats
+    JOIN <game>             takes the first free seat of a game
+    LIST                    lists the games waiting for players
+    QUIT                    disconnects
+In a game, the commands of simulation.terminal_engine: P <card>, D <card>, H <player> <C/N> <colour/number>, L for the log,
+and S for the status of the game from the client's seat.
+
+The server answers with lines starting with a keyword:
+    WELCOME, GAME <game> SEAT <seat> PLAYERS <players>, GAMES ..., START,
+    TURN <player> (sent to the player whose turn it is), ACTION <player> <command> (sent to every seat after each action),
+    INFO <text> (status and log lines), ERROR <message>, GAMEOVER <score>, ABORTED <reason>.
+
+Bots are Players instances, one per game for all its bot seats as in game_runner.run_game. Their get_action and
+update_state calls run in an executor, a thread pool by default, so the loop keeps serving other games meanwhile.
+With a process pool the bot and the game are pickled for every move, so only stateless bots keep their behaviour.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from agents.random_player import RandomPlayers
+from game.hanabi_game import HanabiGame
+from simulation.terminal_engine import parse_command, format_command, check_legal
+
+def _bot_turn(bot, game: HanabiGame, player_index: int, updates: list):
+    """
+    Runs in the executor: gives the bot the step results it has not seen yet, then returns the id of its action.
+    """
+    for game_state, acting_player in updates:
+        bot.update_state(game_state, acting_player)
+    return game.action_space.action_id(bot.get_action(game, player_index))
+
+class ClientConnection:
+    """
+    One connected socket client.
+    """
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.session = None
+        self.seat = None
+
+    def send(self, line: str):
+        if not self.writer.is_closing():
+            self.writer.write(line.encode() + b"\n")
+
+    def send_text(self, text: str):
+        for line in text.splitlines():
+            self.send(f"INFO {line}")
+
+class GameSession:
+    """
+    One hosted game and who sits at each seat.
+
+    Attributes:
+        game (HanabiGame): The game, with its log enabled for the L command.
+        seats (list): The ClientConnection of each human seat, None for bot seats and free seats.
+        bot_seats (set): Seats played by the bot.
+        bot: Players instance playing every bot seat.
+    """
+    def __init__(self, game_id: int, num_players: int, bot_seats: set, bot):
+        self.game_id = game_id
+        self.game = HanabiGame(num_players)
+        self.seats = [None] * num_players
+        self.bot_seats = bot_seats
+        self.bot = bot
+        self.pending_updates = []
+        self.started = False
+        self.finished = False
+        self.task = None
+
+    def free_seats(self):
+        return [seat for seat, client in enumerate(self.seats) if client is None and seat not in self.bot_seats]
+
+    def broadcast(self, line: str):
+        for client in self.seats:
+            if client is not None:
+                client.send(line)
+
+class GameServer:
+    """
+    Hosts GameSessions for socket clients.
+
+    Args:
+        bot_class: Players class of the bots, built as bot_class(num_players) for every game.
+        executor: concurrent.futures executor running the bots. Defaults to a thread pool.
+
+    Usage:
+        server = GameServer()
+        await server.start("127.0.0.1", 8765)
+        await server.serve_forever()
+    """
+    def __init__(self, bot_class=RandomPlayers, executor=None):
+        self.bot_class = bot_class
+        self.executor = executor if executor is not None else ThreadPoolExecutor()
+        self.sessions = {}
+        self.clients = set()
+        self.games_finished = 0
+        self._game_ids = itertools.count(1)
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Starts listening, and returns the port, useful with port 0 which picks a free one.
+        """
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for session in list(self.sessions.values()):
+            self.abort(session, "server closing")
+        for client in list(self.clients):
+            client.writer.close()
+        self.executor.shutdown(wait=False)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = ClientConnection(writer)
+        self.clients.add(client)
+        client.send("WELCOME hanabi, commands: NEW <players> <bots>, JOIN <game>, LIST, QUIT")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                if not command:
+                    continue
+                if command == "QUIT":
+                    break
+                try:
+                    self.handle_command(client, command)
+                except ValueError as error:
+                    client.send(f"ERROR {error}")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if client.session is not None and not client.session.finished:
+                self.abort(client.session, f"player {client.seat} left")
+            self.clients.discard(client)
+            writer.close()
+
+    def handle_command(self, client: ClientConnection, command: str):
+        """
+        Runs one command of a client.
+        Raises:
+            ValueError: If the command is invalid or not allowed now.
+        """
+        words = command.split()
+        if words[0] == "NEW":
+            self.new_game(client, *words[1:])
+        elif words[0] == "JOIN":
+            if len(words) != 2 or not words[1].isdigit():
+                raise ValueError("Use JOIN <game>.")
+            self.join_game(client, int(words[1]))
+        elif words[0] == "LIST":
+            waiting = [f"{game_id}:{len(session.free_seats())}" for game_id, session in self.sessions.items() if not session.started]
+            client.send("GAMES " + " ".join(waiting))
+        elif client.session is None:
+            raise ValueError("Not in a game, use NEW or JOIN first.")
+        elif words == ["S"]:
+            client.send_text(client.session.game.status(client.seat))
+        else:
+            self.play(client, command)
+
+    def new_game(self, client: ClientConnection, *arguments):
+        if client.session is not None:
+            raise ValueError("Already in a game.")
+        try:
+            num_players, num_bots = (int(argument) for argument in arguments)
+        except ValueError:
+            raise ValueError("Use NEW <players> <bots>.")
+        if not 2 <= num_players <= 5 or not 0 <= num_bots < num_players:
+            raise ValueError("Games have 2 to 5 players, and at least one seat is not a bot.")
+        game_id = next(self._game_ids)
+        session = GameSession(game_id, num_players, set(range(num_players - num_bots, num_players)), self.bot_class(num_players))
+        self.sessions[game_id] = session
+        self.seat(client, session, 0)
+
+    def join_game(self, client: ClientConnection, game_id: int):
+        if client.session is not None:
+            raise ValueError("Already in a game.")
+        session = self.sessions.get(game_id)
+        if session is None or not session.free_seats():
+            raise ValueError(f"Game {game_id} cannot be joined.")
+        self.seat(client, session, session.free_seats()[0])
+
+    def seat(self, client: ClientConnection, session: GameSession, seat: int):
+        session.seats[seat] = client
+        client.session, client.seat = session, seat
+        client.send(f"GAME {session.game_id} SEAT {seat} PLAYERS {session.game.NUM_PLAYERS}")
+        if not session.free_seats():
+            session.started = True
+            session.broadcast("START")
+            session.task = asyncio.ensure_future(self.advance(session))
+
+    def play(self, client: ClientConnection, command: str):
+        session, game = client.session, client.session.game
+        action = parse_command(command, client.seat)
+        if action is None:
+            client.send_text(game.log)
+            return
+        if not session.started or session.finished:
+            raise ValueError("The game is not running.")
+        if game.current_player_index != client.seat or session.task is not None and not session.task.done():
+            raise ValueError("Not your turn.")
+        check_legal(game, action)
+        self.apply(session, action)
+        session.task = asyncio.ensure_future(self.advance(session))
+
+    def apply(self, session: GameSession, action):
+        game_state = session.game.step(action, action.player_index)
+        session.pending_updates.append((game_state, action.player_index))
+        session.broadcast(f"ACTION {action.player_index} {format_command(action)}")
+
+    async def advance(self, session: GameSession):
+        """
+        Plays the bot seats until a human has to move or the game ends.
+        """
+        game = session.game
+        loop = asyncio.get_running_loop()
+        while not game.is_game_over():
+            player_index = game.current_player_index
+            if player_index not in session.bot_seats:
+                session.seats[player_index].send(f"TURN {player_index}")
+                return
+            updates, session.pending_updates = session.pending_updates, []
+            try:
+                action_id = await loop.run_in_executor(self.executor, _bot_turn, session.bot, game, player_index, updates)
+                if session.finished:
+                    return
+                self.apply(session, game.action_space.actions[player_index][action_id])
+            except Exception as error:
+                self.abort(session, f"bot error: {error}")
+                return
+        session.finished = True
+        session.broadcast(f"GAMEOVER {game.get_score()}")
+        self.games_finished += 1
+        self.close_session(session)
+
+    def abort(self, session: GameSession, reason: str):
+        session.finished = True
+        session.broadcast(f"ABORTED {reason}")
+        self.close_session(session)
+
+    def close_session(self, session: GameSession):
+        self.sessions.pop(session.game_id, None)
+        for client in session.seats:
+            if client is not None:
+                client.session = client.seat = None
+
+async def play_test_client(host: str, port: int, num_players: int, num_bots: int, seed: int = None):
+    """
+    Local socket client playing one game against bots, with random plays and discards. Returns the final score.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"NEW {num_players} {num_bots}\n".encode())
+    score = None
+    while score is None:
+        line = (await reader.readline()).decode()
+        if not line:
+            raise ConnectionError("Server closed the connection.")
+        if line.startswith("TURN"):
+            writer.write(f"{rng.choice('PD')} 0\n".encode())
+        elif line.startswith("GAMEOVER"):
+            score = int(line.split()[1])
+        elif line.startswith(("ERROR", "ABORTED")):
+            raise RuntimeError(line.strip())
+    writer.write(b"QUIT\n")
+    writer.close()
+    return score
+
+async def load_test(num_clients: int, num_players: int, processes: bool = False):
+    """
+    Starts a server and has num_clients local socket clients play against bots at the same time.
+    """
+    server = GameServer(executor=ProcessPoolExecutor() if processes else None)
+    port = await server.start()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    scores = await asyncio.gather(*(play_test_client("127.0.0.1", port, num_players, num_players - 1, seed)
+                                    for seed in range(num_clients)))
+    elapsed = loop.time() - start
+    await server.close()
+    print(f"{len(scores)} games in {elapsed:.2f}s, {len(scores) / elapsed:.0f} games/s, mean score {sum(scores) / len(scores):.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hosts Hanabi games for socket clients and bots.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", action="store_true", help="Run the bots in a process pool instead of threads")
+    parser.add_argument("--load-test", type=int, metavar="CLIENTS", help="Play this many local client games against bots and exit")
+    parser.add_argument("--players", type=int, default=4, help="Players per game of the load test")
+    args = parser.parse_args(argv)
+    if args.load_test:
+        asyncio.run(load_test(args.load_test, args.players, args.processes))
+        return
+
+    async def serve():
+        server = GameServer(executor=ProcessPoolExecutor() if args.processes else None)
+        port = await server.start(args.host, args.port)
+        print(f"Serving Hanabi on {args.host}:{port}")
+        await server.serve_forever()
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,98 @@
-def run_simulation(game_class, players_class, n_games: int):
-    results = []
-    for _ in range(n_games):
-        game = game_class()
-        players = players_class()
-        while not game.is_game_over():
-            for i in range(game.num_players):
-                obs = game.get_observation(i)
-                action = players.choose_action(obs)
-                game.apply_action(i, action)
-        results.append(game.get_score())
-    return results
+# simulation/simulation_runner.py
+import hashlib
+import os
+import random
+from multiprocessing import Pool
+
+from game.game_runner import run_game
+from game.hanabi_game import HanabiGame
+
+def derive_seed(master_seed: int, game_index: int):
+    """
+    Returns the 64-bit seed of one game, derived from the master seed and the index of the game.
+    The same (master_seed, game_index) pair always gives the same seed, whichever process computes it.
+    """
+    digest = hashlib.blake2b(f"{master_seed}:{game_index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+# One HanabiGame per player count and process, reset for every game instead of built again
+_recycled_games = {}
+
+def play_seeded_game(players_class, num_players: int, master_seed: int, game_index: int):
+    """
+    Plays game number game_index of a simulation and returns the finished HanabiGame.
+    The deal is shuffled from a seed derived from the game index, the global random module used by the agents
+    is seeded from it too, and a fresh players instance is built, so the game only depends on (master_seed, game_index).
+    The returned game is recycled by the next call in the same process.
+    """
+    game = _recycled_games.get(num_players)
+    if game is None:
+        game = _recycled_games[num_players] = HanabiGame(num_players, enable_log=False)
+    game_seed = derive_seed(master_seed, game_index)
+    random.seed(game_seed)  # After building the game, whose first shuffle uses the global random module
+    run_game(players_class(num_players), game=game, seed=game_seed)
+    return game
+
+def play_game(players_class, num_players: int, master_seed: int, game_index: int):
+    """
+    Plays game number game_index of a simulation and returns its score, see play_seeded_game.
+    """
+    return play_seeded_game(players_class, num_players, master_seed, game_index).get_score()
+
+def chunk_ranges(n_games: int, chunk_size: int):
+    """
+    Splits the game indices [0, n_games) into (start, stop) ranges of at most chunk_size games.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive.")
+    return [(start, min(start + chunk_size, n_games)) for start in range(0, n_games, chunk_size)]
+
+def map_chunks(function, tasks: list, workers: int = None):
+    """
+    Yields function(task) for every task, computed by a pool of worker processes, in the order they finish.
+    Args:
+        function: Module-level function, so that the workers can import it.
+        tasks (list): Picklable arguments, one per call.
+        workers (int): Number of worker processes. Defaults to the number of CPUs, 1 runs in the current process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+    with Pool(processes=min(workers, max(len(tasks), 1))) as pool:
+        yield from pool.imap_unordered(function, tasks)
+
+def _play_chunk(task):
+    """
+    Plays the games of indices [start, stop) in a worker process and returns their (index, score) pairs.
+    """
+    players_class, num_players, master_seed, start, stop = task
+    return [(game_index, play_game(players_class, num_players, master_seed, game_index)) for game_index in range(start, stop)]
+
+def iter_simulation(players_class, num_players: int, n_games: int, seed: int = 0, workers: int = None, chunk_size: int = 64):
+    """
+    Plays n_games games and yields (game_index, score) pairs as chunks of games finish, in no particular order.
+    Args:
+        players_class: Players subclass, built as players_class(num_players) for every game. It must be importable by the workers.
+        num_players (int): Number of players in each game.
+        n_games (int): Number of games to play.
+        seed (int): Master seed; game i is played with the seed derive_seed(seed, i).
+        workers (int): Number of worker processes. Defaults to the number of CPUs, 1 plays in the current process.
+        chunk_size (int): Number of games sent to a worker at once.
+    The score of each game does not depend on workers or chunk_size.
+    """
+    tasks = [(players_class, num_players, seed, start, stop) for start, stop in chunk_ranges(n_games, chunk_size)]
+    for results in map_chunks(_play_chunk, tasks, workers):
+        yield from results
+
+def run_simulation(players_class, num_players: int, n_games: int, seed: int = 0, workers: int = None, chunk_size: int = 64):
+    """
+    Plays n_games games, possibly across several processes, and returns their scores ordered by game index.
+    See iter_simulation for the arguments.
+    """
+    scores = [0] * n_games
+    for game_index, score in iter_simulation(players_class, num_players, n_games, seed, workers, chunk_size):
+        scores[game_index] = score
+    return scores
@@ -1,5 +1,66 @@
 from game.hanabi_game import HanabiGame, Action, ActionType, HintType
 
+USAGE = "Use P <card_index>, D <card_index>, H <target_player> <C/N> <colour/number>, or L for the log"
+
+def parse_command(command: str, current_player: int):
+    """
+    Parses a terminal command into the Action of the current player.
+        P 2         plays the card at index 2
+        D 3         discards the card at index 3
+        H 1 C red   gives a hint to player 1 about colour red
+        H 3 N 4     gives a hint to player 3 about number 4
+    Returns None for L, which asks for the log.
+    Raises:
+        ValueError: If the command is not one of the above.
+    """
+    words = command.split()
+    try:
+        if words[0] == "P" and len(words) == 2:
+            return Action(ActionType.PLAY_CARD, player_index=current_player, card_index=int(words[1]))
+        if words[0] == "D" and len(words) == 2:
+            return Action(ActionType.DISCARD_CARD, player_index=current_player, card_index=int(words[1]))
+        if words[0] == "H" and len(words) == 4:
+            if words[2] == "C":
+                hint_type, hint_value = HintType.COLOUR, words[3]
+            elif words[2] == "N":
+                hint_type, hint_value = HintType.NUMBER, int(words[3])
+            else:
+                raise ValueError
+            return Action(ActionType.GIVE_HINT, player_index=current_player, target_player_index=int(words[1]),
+                          hint_type=hint_type, hint_value=hint_value)
+        if words == ["L"]:
+            return None
+    except (IndexError, ValueError):
+        pass
+    raise ValueError(f"Invalid action. {USAGE}")
+
+def format_command(action: Action):
+    """
+    Returns the terminal command of an action, the inverse of parse_command.
+    """
+    if action.type == ActionType.PLAY_CARD:
+        return f"P {action.card_index}"
+    if action.type == ActionType.DISCARD_CARD:
+        return f"D {action.card_index}"
+    hint_type = "C" if action.hint_type == HintType.COLOUR else "N"
+    return f"H {action.target_player_index} {hint_type} {action.hint_value}"
+
+def check_legal(game: HanabiGame, action: Action):
+    """
+    Raises ValueError if the current player of game cannot take action, without changing the game.
+    """
+    if action.type == ActionType.GIVE_HINT:
+        if not 0 <= action.target_player_index < game.NUM_PLAYERS:
+            raise ValueError(f"Illegal action: no player {action.target_player_index}.")
+    elif action.card_index < 0:
+        raise ValueError(f"Illegal action: no card {action.card_index}.")
+    try:
+        action_id = game.action_space.action_id(action)
+    except ValueError as error:
+        raise ValueError(f"Illegal action: {error}")
+    if not game.legal_action_mask() >> action_id & 1:
+        raise ValueError("Illegal action.")
+
 def get_valid_player_count():
     while True:
         try:
@@ -14,7 +75,7 @@ def main():
     # Get player count and initialize game
     n_players = get_valid_player_count()
     game = HanabiGame(n_players)
-    
+
     # Main game loop
     while not game.is_game_over():
         current_player = game.current_player_index
@@ -22,45 +83,21 @@ def main():
         print(game.status(current_player))
 
         # Wait for player input
-        action = [c for c in input("Enter your action: ").split(" ")]
-        print(f"Action received: {action}")
-        if action[0] == "P":#ex: P 2 plays card at index 2
-            card_index = int(action[1])
-            action = Action(ActionType.PLAY_CARD, player_index = current_player, card_index = card_index)
-        elif action[0] == "D":#ex: D 3 discards card at index 3
-            card_index = int(action[1])
-            action = Action(ActionType.DISCARD_CARD, player_index = current_player, card_index = card_index)
-        elif action[0] == "H":
-            #ex: H 1 C red gives hint to player 1 about colour red
-            #ex: H 3 N 4 gives hint to player 3 about number 4
-            target_player = int(action[1])
-            hint_type = action[2]
-            if hint_type == "C":
-                hint_colour = action[3]
-                action = Action(
-                    ActionType.GIVE_HINT, 
-                    player_index = current_player, 
-                    target_player_index = target_player, 
-                    hint_type=HintType.COLOUR, 
-                    hint_value=hint_colour)
-            elif hint_type == "N":
-                hint_number = int(action[3])
-                action = Action(
-                    ActionType.GIVE_HINT, 
-                    player_index = current_player, 
-                    target_player_index = target_player, 
-                    hint_type=HintType.NUMBER, 
-                    hint_value=hint_number)
-        elif action[0] == "L":
+        command = input("Enter your action: ")
+        print(f"Action received: {command.split(' ')}")
+        try:
+            action = parse_command(command, current_player)
+        except ValueError as e:
+            print(e)
+            continue
+        if action is None:
             print("Current game log:")
             print(game.log)
             continue
-        else:
-            print("Invalid action. Use P <card_index>, D <card_index>, or H <target_player> <C/N> [<colour/number>]")
-            continue
 
         try:
-            game.apply_action(action)
+            check_legal(game, action)
+            game.step(action, current_player)
         except Exception as e:
             print(f"Error applying action: {e}\n")
             print(f"Try again with a valid action.\n")
@@ -72,4 +109,4 @@ def main():
 
 if __name__ == "__main__":
     while True:
-        main()
\ No newline at end of file
+        main()
@@ -0,0 +1,132 @@
+# statistics_for_players/evaluation.py
+from simulation.simulation_runner import chunk_ranges, map_chunks, play_seeded_game
+
+MAX_SCORE = 25
+MAX_LIVES = 3
+
+class ScoreStatistics:
+    """
+    Online statistics of game scores, in constant memory.
+    Everything is kept as integer counts and sums, so merging the statistics of several workers
+    gives exactly the same result as adding all the games to one instance, in any order.
+
+    Attributes:
+        count (int): Number of games.
+        total (int): Sum of the scores.
+        total_squares (int): Sum of the squared scores.
+        min (int): Lowest score, None before the first game.
+        max (int): Highest score, None before the first game.
+        histogram (list): histogram[s] is the number of games that scored s, for s in 0..25.
+        lives_lost (list): lives_lost[n] is the number of games that lost n lives, for n in 0..3.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * (MAX_SCORE + 1)
+        self.lives_lost = [0] * (MAX_LIVES + 1)
+
+    def add(self, score: int, lives_lost: int = 0):
+        """
+        Adds the result of one game.
+        """
+        self.count += 1
+        self.total += score
+        self.total_squares += score * score
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        self.histogram[score] += 1
+        self.lives_lost[lives_lost] += 1
+
+    def add_game(self, game):
+        """
+        Adds the result of a finished HanabiGame.
+        """
+        self.add(game.get_score(), MAX_LIVES - game.lives)
+
+    def merge(self, other: 'ScoreStatistics'):
+        """
+        Adds every game of other to these statistics, and returns self.
+        """
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.lives_lost = [a + b for a, b in zip(self.lives_lost, other.lives_lost)]
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def variance(self):
+        """
+        Returns the unbiased sample variance of the scores.
+        """
+        if self.count < 2:
+            return 0.0
+        return (self.total_squares - self.total * self.total / self.count) / (self.count - 1)
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    def perfect_rate(self):
+        """
+        Returns the fraction of games with the maximum score.
+        """
+        return self.histogram[MAX_SCORE] / self.count if self.count else 0.0
+
+    def snapshot(self):
+        """
+        Returns the current statistics as a plain dictionary, for progress reports or JSON.
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "std": self.std(),
+            "min": self.min,
+            "max": self.max,
+            "perfect_rate": self.perfect_rate(),
+            "histogram": list(self.histogram),
+            "lives_lost": list(self.lives_lost),
+        }
+
+    def __repr__(self):
+        return (f"ScoreStatistics(count={self.count}, mean={self.mean():.3f}, std={self.std():.3f}, "
+                f"min={self.min}, max={self.max}, perfect_rate={self.perfect_rate():.4f})")
+
+def _evaluate_chunk(task):
+    """
+    Plays the games of indices [start, stop) in a worker process and returns their ScoreStatistics.
+    """
+    players_class, num_players, seed, start, stop = task
+    statistics = ScoreStatistics()
+    for game_index in range(start, stop):
+        statistics.add_game(play_seeded_game(players_class, num_players, seed, game_index))
+    return statistics
+
+def evaluate(players_class, num_players: int, n_games: int, seed: int = 0, workers: int = None, chunk_size: int = 256, progress=None):
+    """
+    Plays n_games seeded games with any Players implementation and returns their ScoreStatistics.
+    Each worker returns the statistics of a chunk of games, merged as chunks finish.
+    Games are seeded as in simulation.simulation_runner, so the result does not depend on workers or chunk_size.
+    Args:
+        players_class: Players subclass, built as players_class(num_players) for every game.
+        num_players (int): Number of players in each game.
+        n_games (int): Number of games to play.
+        seed (int): Master seed of the games.
+        workers (int): Number of worker processes, see simulation.simulation_runner.map_chunks.
+        chunk_size (int): Number of games per worker task.
+        progress: Optional callback, called with the statistics so far every time a chunk finishes.
+    """
+    tasks = [(players_class, num_players, seed, start, stop) for start, stop in chunk_ranges(n_games, chunk_size)]
+    statistics = ScoreStatistics()
+    for partial in map_chunks(_evaluate_chunk, tasks, workers):
+        statistics.merge(partial)
+        if progress is not None:
+            progress(statistics)
+    return statistics
@@ -1,24 +1,22 @@
-from agents.players import Players  # abstract base class
-from game.game_runner import run_game
+from statistics_for_players.evaluation import evaluate, MAX_SCORE
 import time
 
 # Example usage
 if __name__ == "__main__":
     from agents.random_player import RandomPlayers
-    players = RandomPlayers(4)
-    SCORES = []
+    NUM_PLAYERS = 4
     RUN_NUMBER = 2**14  # 16384 games
     print(f"Running {RUN_NUMBER} games with random players...")
-    for i in range(RUN_NUMBER):
-        #print(f"Game {i+1}")
-        SCORES += [run_game(players, False)]
-    print(f"Final score: {sum(SCORES) / RUN_NUMBER}")
+    statistics = evaluate(RandomPlayers, NUM_PLAYERS, RUN_NUMBER,
+                          progress=lambda partial: print(f"{partial.count} games, mean score {partial.mean():.3f}", end="\r"))
+    print()
+    print(f"Final score: {statistics.mean()}")
+    print(statistics)
     import matplotlib.pyplot as plt
-    plt.hist(SCORES, bins=30)
+    plt.bar(range(MAX_SCORE + 1), statistics.histogram)
     plt.xlabel('Score')
     plt.ylabel('Frequency')
     plt.title(f'Distribution of Hanabi Scores for Random Players in {RUN_NUMBER} Games')
     timestamp = int(time.time())
     plt.savefig(f'plots/plot_hanabiscores_randomplayers{timestamp}.png')
     plt.close()
-    
\ No newline at end of file
@@ -0,0 +1,239 @@
+# statistics_for_players/tournament.py
+"""
+Tournament between Players implementations, on identical seeded deals.
+
+Game i of a player count is dealt from the same seed for every agent (see simulation.simulation_runner.play_seeded_game),
+so each matchup compares the paired score differences of two agents, which vary much less than the scores themselves.
+Games are played in rounds, and a matchup stops as soon as the confidence interval on its mean difference is narrower
+than the requested precision, or does not contain zero any more. Since the second test is repeated after every round,
+it uses a wider interval, with the error rate split evenly across the rounds a matchup may play (a Bonferroni bound),
+so that the chance of a wrong verdict between two equal agents stays below 1 - confidence. Agents stop playing a player
+count once all their matchups there are finished.
+
+Usage:
+    python -m statistics_for_players.tournament agents.random_player:RandomPlayers my_agents:SmartPlayers --players 2 3
+"""
+import argparse
+import importlib
+from statistics import NormalDist
+
+from simulation.simulation_runner import chunk_ranges, map_chunks, play_game
+from statistics_for_players.evaluation import ScoreStatistics
+
+class PairedComparison:
+    """
+    Running statistics of the score differences (first - second) of two agents on the same deals.
+    """
+    def __init__(self, num_players: int, first: str, second: str):
+        self.num_players = num_players
+        self.first = first
+        self.second = second
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.finished = False
+
+    def add(self, difference: int):
+        self.count += 1
+        self.total += difference
+        self.total_squares += difference * difference
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        return max((self.total_squares - self.total * self.total / self.count) / (self.count - 1), 0.0) ** 0.5
+
+    def half_width(self, z: float):
+        """
+        Returns the half width of the normal confidence interval of the mean difference.
+        """
+        return z * self.std() / self.count ** 0.5 if self.count else float("inf")
+
+    def is_decided(self, z: float):
+        """
+        Tells whether the confidence interval excludes zero, i.e. one agent is better.
+        """
+        return self.count > 1 and abs(self.mean()) > self.half_width(z)
+
+    def verdict(self, z: float):
+        if not self.is_decided(z):
+            return "tie"
+        return f"{self.first} better" if self.mean() > 0 else f"{self.second} better"
+
+    def __repr__(self):
+        return f"PairedComparison({self.num_players}p {self.first} - {self.second}: {self.mean():+.3f} over {self.count} games)"
+
+class TournamentResult:
+    """
+    Outcome of run_tournament.
+
+    Attributes:
+        statistics (dict): statistics[num_players][name] is the ScoreStatistics of an agent.
+        matchups (list): PairedComparison of every pair of agents and player count.
+        confidence (float): Confidence level of the intervals.
+        looks (int): Number of times each matchup may be tested for a verdict, 1 for a single test at the end.
+        z (float): Normal quantile of the confidence intervals.
+        verdict_z (float): Normal quantile of the verdicts, with 1 - confidence split evenly across the looks.
+    """
+    def __init__(self, statistics: dict, matchups: list, confidence: float, looks: int = 1):
+        self.statistics = statistics
+        self.matchups = matchups
+        self.confidence = confidence
+        self.looks = looks
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.verdict_z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * looks))
+
+    def games_played(self):
+        return sum(stats.count for by_agent in self.statistics.values() for stats in by_agent.values())
+
+    def leaderboard(self, num_players: int):
+        """
+        Returns the (name, ScoreStatistics) of the agents of a player count, best mean score first.
+        """
+        return sorted(self.statistics[num_players].items(), key=lambda item: item[1].mean(), reverse=True)
+
+    def report(self):
+        """
+        Returns the leaderboard and the matchups of every player count as text.
+        """
+        lines = []
+        for num_players in self.statistics:
+            lines.append(f"{num_players} players")
+            lines.append(f"  {'rank':<5}{'agent':<24}{'mean':>8}{'ci':>8}{'games':>8}{'perfect':>9}")
+            for rank, (name, stats) in enumerate(self.leaderboard(num_players), 1):
+                ci = self.z * stats.std() / stats.count ** 0.5 if stats.count else 0.0
+                lines.append(f"  {rank:<5}{name:<24}{stats.mean():>8.3f}{ci:>8.3f}{stats.count:>8}{stats.perfect_rate():>9.4f}")
+            for matchup in self.matchups:
+                if matchup.num_players == num_players:
+                    lines.append(f"  {matchup.first} - {matchup.second}: {matchup.mean():+.3f} ± {matchup.half_width(self.z):.3f}"
+                                 f" over {matchup.count} deals, {matchup.verdict(self.verdict_z)}")
+            lines.append("")
+        lines.append(f"{self.games_played()} games played, {self.confidence:.0%} confidence intervals")
+        if self.looks > 1:
+            lines[-1] += f", verdicts corrected for up to {self.looks} looks (z = {self.verdict_z:.2f})"
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"TournamentResult({len(self.matchups)} matchups, {self.games_played()} games)"
+
+def _play_agent_chunk(task):
+    """
+    Plays the games of indices [start, stop) of one agent in a worker process.
+    """
+    name, players_class, num_players, seed, start, stop = task
+    return name, num_players, start, [play_game(players_class, num_players, seed, game_index) for game_index in range(start, stop)]
+
+def stopping_checks(min_games: int, max_games: int, round_size: int):
+    """
+    Returns the number of rounds after which run_tournament may stop a matchup, i.e. the rounds ending with at least
+    min_games deals played, up to the one reaching max_games.
+    """
+    checks = 0
+    stop = 0
+    while stop < max_games:
+        stop = min(stop + max(round_size, min_games - stop), max_games)
+        if stop >= min_games:
+            checks += 1
+    return checks
+
+def run_tournament(agents: dict, player_counts=(2, 3, 4, 5), seed: int = 0, confidence: float = 0.95, precision: float = 0.25,
+                   min_games: int = 100, max_games: int = 16384, round_size: int = 256, stop_when_decided: bool = True,
+                   workers: int = None, chunk_size: int = 64, progress=None):
+    """
+    Compares every pair of agents at every player count on identical seeded deals, with early stopping.
+    Args:
+        agents (dict): Players classes by name, built as players_class(num_players). They must be importable by the workers.
+        player_counts (tuple): Numbers of players to compare them at.
+        seed (int): Master seed of the deals.
+        confidence (float): Confidence level of the intervals.
+        precision (float): A matchup stops once the half width of its interval is at most this many points.
+        min_games (int): Deals played before a matchup may stop.
+        max_games (int): Deals after which a matchup stops anyway.
+        round_size (int): Deals played per player count between two stopping checks.
+        stop_when_decided (bool): Also stop a matchup as soon as one agent is better. Every round is then a test, so
+            the verdicts use the interval widened for stopping_checks(min_games, max_games, round_size) looks.
+        workers (int): Number of worker processes, see simulation.simulation_runner.map_chunks.
+        chunk_size (int): Games per worker task.
+        progress: Optional callback, called with the TournamentResult so far after every round.
+    Returns:
+        TournamentResult
+    Raises:
+        ValueError: If fewer than two agents are given.
+    """
+    if len(agents) < 2:
+        raise ValueError("A tournament needs at least two agents.")
+    names = list(agents)
+    statistics = {num_players: {name: ScoreStatistics() for name in names} for num_players in player_counts}
+    matchups = [PairedComparison(num_players, first, second)
+                for num_players in player_counts for i, first in enumerate(names) for second in names[i + 1:]]
+    result = TournamentResult(statistics, matchups, confidence, stopping_checks(min_games, max_games, round_size) if stop_when_decided else 1)
+    played = dict.fromkeys(player_counts, 0)
+    while True:
+        tasks, rounds = [], {}
+        for num_players in player_counts:
+            open_matchups = [m for m in matchups if m.num_players == num_players and not m.finished]
+            if not open_matchups:
+                continue
+            start = played[num_players]
+            stop = min(start + max(round_size, min_games - start), max_games)
+            rounds[num_players] = (start, stop, open_matchups)
+            needed = {m.first for m in open_matchups} | {m.second for m in open_matchups}
+            for name in names:
+                if name in needed:
+                    tasks += [(name, agents[name], num_players, seed, start + first, start + last)
+                              for first, last in chunk_ranges(stop - start, chunk_size)]
+        if not tasks:
+            return result
+        scores = {(num_players, name): [0] * (stop - start) for num_players, (start, stop, _) in rounds.items() for name in names}
+        for name, num_players, first, chunk_scores in map_chunks(_play_agent_chunk, tasks, workers):
+            offset = first - rounds[num_players][0]
+            scores[num_players, name][offset:offset + len(chunk_scores)] = chunk_scores
+            for score in chunk_scores:
+                statistics[num_players][name].add(score)
+        for num_players, (start, stop, open_matchups) in rounds.items():
+            played[num_players] = stop
+            for matchup in open_matchups:
+                for first_score, second_score in zip(scores[num_players, matchup.first], scores[num_players, matchup.second]):
+                    matchup.add(first_score - second_score)
+                matchup.finished = (stop >= max_games or
+                                    (matchup.count >= min_games and (matchup.half_width(result.z) <= precision or
+                                                                     (stop_when_decided and matchup.is_decided(result.verdict_z)))))
+        if progress is not None:
+            progress(result)
+
+def load_players_class(path: str):
+    """
+    Imports a Players class given as "module:ClassName".
+    """
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise ValueError(f"Expected module:ClassName, got {path}.")
+    return getattr(importlib.import_module(module_name), class_name)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compares Players implementations on identical seeded deals.")
+    parser.add_argument("agents", nargs="+", help="Players classes, as module:ClassName")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 3, 4, 5], help="Player counts")
+    parser.add_argument("--seed", type=int, default=0, help="Master seed of the deals")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the intervals")
+    parser.add_argument("--precision", type=float, default=0.25, help="Target half width of the score difference intervals")
+    parser.add_argument("--max-games", type=int, default=16384, help="Most deals per matchup")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the number of CPUs")
+    args = parser.parse_args(argv)
+    agents = {}
+    for path in args.agents:
+        name = path.rpartition(":")[2]
+        # The same class may be entered twice, e.g. to check that the harness finds no difference
+        while name in agents:
+            name += "'"
+        agents[name] = load_players_class(path)
+    result = run_tournament(agents, args.players, args.seed, args.confidence, args.precision, max_games=args.max_games,
+                            workers=args.workers, progress=lambda partial: print(f"{partial.games_played()} games played", end="\r"))
+    print()
+    print(result.report())
+
+if __name__ == "__main__":
+    main()
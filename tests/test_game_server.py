@@ -0,0 +1,167 @@
+# tests/test_game_server.py
+"""
+Protocol tests of simulation.game_server, with local socket clients only.
+
+Usage:
+    python3 -m pytest tests
+"""
+import asyncio
+import unittest
+
+from simulation.game_server import GameServer
+
+TIMEOUT = 10.0
+
+class SocketClient:
+    """
+    Socket client reading the server line by line.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @staticmethod
+    async def connect(port: int):
+        client = SocketClient(*await asyncio.open_connection("127.0.0.1", port))
+        assert (await client.read_line()).startswith("WELCOME")
+        return client
+
+    async def send(self, line: str):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+
+    async def read_line(self):
+        """
+        Returns the next line sent by the server, "" once it closed the connection.
+        """
+        return (await asyncio.wait_for(self.reader.readline(), TIMEOUT)).decode().strip()
+
+    async def read_until(self, *keywords):
+        """
+        Returns the lines read up to the first one starting with one of keywords, included.
+        """
+        lines = []
+        while True:
+            line = await self.read_line()
+            if not line:
+                raise ConnectionError(f"Connection closed before {keywords}, after {lines}")
+            lines.append(line)
+            if line.startswith(keywords):
+                return lines
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = GameServer()
+        self.port = await self.server.start()
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        # Lets the server see the disconnections before its loop stops
+        await asyncio.wait_for(self.disconnected(), TIMEOUT)
+        await self.server.close()
+
+    async def disconnected(self):
+        while self.server.clients:
+            await asyncio.sleep(0.01)
+
+    async def connect(self):
+        client = await SocketClient.connect(self.port)
+        self.clients.append(client)
+        return client
+
+    async def test_new_and_join(self):
+        host = await self.connect()
+        await host.send("NEW 3 1")
+        self.assertEqual(await host.read_line(), "GAME 1 SEAT 0 PLAYERS 3")
+        guest = await self.connect()
+        await guest.send("LIST")
+        self.assertEqual(await guest.read_line(), "GAMES 1:1")
+        await guest.send("JOIN 1")
+        self.assertEqual(await guest.read_line(), "GAME 1 SEAT 1 PLAYERS 3")
+        self.assertEqual(await guest.read_line(), "START")
+        self.assertEqual(await host.read_line(), "START")
+        self.assertEqual(await host.read_line(), "TURN 0")
+        # The game is full and running, so it can no longer be joined
+        late = await self.connect()
+        await late.send("JOIN 1")
+        self.assertEqual(await late.read_line(), "ERROR Game 1 cannot be joined.")
+        await late.send("LIST")
+        self.assertEqual(await late.read_line(), "GAMES")
+
+    async def test_invalid_commands(self):
+        client = await self.connect()
+        for command in ("NEW 6 0", "NEW 2 2", "NEW two", "JOIN x", "JOIN 7", "P 0"):
+            await client.send(command)
+            self.assertTrue((await client.read_line()).startswith("ERROR"), command)
+
+    async def test_illegal_moves(self):
+        host = await self.connect()
+        await host.send("NEW 2 0")
+        await host.read_until("GAME")
+        await host.send("P 0")
+        self.assertEqual(await host.read_line(), "ERROR The game is not running.")
+        guest = await self.connect()
+        await guest.send("JOIN 1")
+        await guest.read_until("START")
+        await host.read_until("TURN 0")
+        await guest.send("P 0")
+        self.assertEqual(await guest.read_line(), "ERROR Not your turn.")
+        for command in ("H 0 N 1", "H 5 N 1", "H 1 C purple", "H 1 N 6", "P 9", "D -1", "X"):
+            await host.send(command)
+            self.assertTrue((await host.read_line()).startswith("ERROR"), command)
+        # None of the errors changed the game
+        game = self.server.sessions[1].game
+        self.assertEqual((game.turn_count, game.hints_available), (0, game.MAX_HINTS))
+        await host.send("H 1 N 1")
+        self.assertEqual(await host.read_line(), "ACTION 0 H 1 N 1")
+        self.assertEqual(await guest.read_line(), "ACTION 0 H 1 N 1")
+        self.assertEqual(await guest.read_line(), "TURN 1")
+
+    async def test_bots_play_their_turns(self):
+        client = await self.connect()
+        await client.send("NEW 3 2")
+        self.assertEqual((await client.read_until("START"))[0], "GAME 1 SEAT 0 PLAYERS 3")
+        actors = []
+        while True:
+            line = (await client.read_until("TURN", "GAMEOVER", "ABORTED", "ERROR", "ACTION"))[-1]
+            if line.startswith("GAMEOVER"):
+                break
+            self.assertFalse(line.startswith(("ABORTED", "ERROR")), line)
+            if line.startswith("ACTION"):
+                actors.append(int(line.split()[1]))
+            else:
+                self.assertEqual(line, "TURN 0")
+                # Every play is legal while the hand has cards, and misplays end the game quickly
+                await client.send("P 0")
+        # Seats take turns in order, the bots included
+        self.assertEqual(actors, [turn % 3 for turn in range(len(actors))])
+        self.assertGreaterEqual(len(actors), 3)
+        self.assertEqual(self.server.games_finished, 1)
+        self.assertEqual(self.server.sessions, {})
+
+    async def test_disconnect_aborts_the_game(self):
+        host = await self.connect()
+        await host.send("NEW 3 1")
+        await host.read_until("GAME")
+        guest = await self.connect()
+        await guest.send("JOIN 1")
+        await guest.read_until("START")
+        await host.read_until("TURN 0")
+        await guest.close()
+        self.clients.remove(guest)
+        self.assertEqual((await host.read_until("ABORTED"))[-1], "ABORTED player 1 left")
+        self.assertEqual(self.server.sessions, {})
+        # The remaining client is out of the game and can start another one
+        await host.send("P 0")
+        self.assertEqual(await host.read_line(), "ERROR Not in a game, use NEW or JOIN first.")
+        await host.send("NEW 2 1")
+        self.assertEqual(await host.read_line(), "GAME 2 SEAT 0 PLAYERS 2")
+
+if __name__ == "__main__":
+    unittest.main()
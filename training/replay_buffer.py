@@ -0,0 +1,300 @@
+# training/replay_buffer.py
+"""
+Fixed-capacity trajectory buffer in shared memory, written by actor processes and read by learners without pickling.
+
+Steps are stored in ring arrays of `capacity` steps, one shared memory block for all of them.
+Every episode is stored contiguously: when it does not fit before the end of the ring, it starts again at slot 0.
+Writing an episode evicts the older episodes whose slots it overwrites, and the oldest entry of the episode table
+when that table is full, so memory use never grows.
+
+Trajectories handed out by the buffer are views into the shared memory. They stay valid until their episode is
+evicted, which is_valid tells after the fact, so a learner copies what it needs and then checks.
+"""
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+WRITING = 1
+READY = 2
+
+class Trajectory:
+    """
+    A window of consecutive steps of one episode, as views into a TrajectoryBuffer.
+
+    Attributes:
+        episode_id (int): Number of the episode in the order episodes were appended.
+        start (int): Index of the first step of the window in its episode.
+        observations (np.ndarray): (T, num_players, observation_size) observations of every seat before each step.
+        players (np.ndarray): (T,) player who acted.
+        actions (np.ndarray): (T,) action ids.
+        rewards (np.ndarray): (T,) rewards.
+        legal_masks (np.ndarray): (T, num_actions) legal actions.
+        hidden_states (np.ndarray): (T, num_players, hidden_size) recurrent states before each step, None if not stored.
+    """
+    __slots__ = ("episode_id", "start", "observations", "players", "actions", "rewards", "legal_masks", "hidden_states")
+
+    def __init__(self, episode_id, start, observations, players, actions, rewards, legal_masks, hidden_states):
+        self.episode_id = episode_id
+        self.start = start
+        self.observations = observations
+        self.players = players
+        self.actions = actions
+        self.rewards = rewards
+        self.legal_masks = legal_masks
+        self.hidden_states = hidden_states
+
+    def __len__(self):
+        return len(self.actions)
+
+    @property
+    def score(self):
+        return int(self.rewards.sum())
+
+    def __repr__(self):
+        return f"Trajectory(episode {self.episode_id}, steps {self.start} to {self.start + len(self)})"
+
+class TrajectoryBuffer:
+    """
+    Shared memory ring buffer of episodes.
+
+    Args:
+        capacity (int): Number of steps stored.
+        num_players (int): Number of players of the games.
+        observation_size (int): Length of one observation vector.
+        num_actions (int): Number of action ids.
+        hidden_size (int): Size of the recurrent states stored with every step, 0 not to store them.
+        max_episodes (int): Size of the episode table. Defaults to capacity // 8.
+        observation_dtype: Data type of the observations.
+
+    The buffer must be given to other processes when they are created, since it holds a multiprocessing lock.
+    The process that created it calls unlink once every process is done with it.
+
+    Usage:
+        buffer = TrajectoryBuffer(2 ** 16, num_players, observation_size(num_players), num_actions)
+        # in actor processes
+        buffer.append(observations, players, actions, rewards, legal_masks)
+        # in the learner
+        windows, weights = buffer.sample(32, 20, prioritized=True)
+    """
+    def __init__(self, capacity: int, num_players: int, observation_size: int, num_actions: int, hidden_size: int = 0,
+                 max_episodes: int = None, observation_dtype=np.uint8):
+        if capacity < 1:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self.num_players = num_players
+        self.observation_size = observation_size
+        self.num_actions = num_actions
+        self.hidden_size = hidden_size
+        self.max_episodes = max_episodes if max_episodes is not None else max(capacity // 8, 1)
+        self.observation_dtype = np.dtype(observation_dtype)
+        self.lock = mp.Lock()
+        self.shared = shared_memory.SharedMemory(create=True, size=self.__layout_size())
+        self.name = self.shared.name
+        self.__map_arrays()
+        self._header[:] = 0
+        self._episode_states[:] = 0
+        self._max_priority[0] = 1.0
+
+    def __layout(self):
+        """
+        Yields (name, shape, dtype) of every array of the shared block, in order.
+        """
+        c, e, p = self.capacity, self.max_episodes, self.num_players
+        yield "_header", (2,), np.int64                  # next free slot, next episode id
+        yield "_max_priority", (1,), np.float64
+        yield "_episode_ids", (e,), np.int64
+        yield "_episode_starts", (e,), np.int64
+        yield "_episode_lengths", (e,), np.int64
+        yield "_episode_priorities", (e,), np.float64
+        yield "_episode_states", (e,), np.int8
+        yield "observations", (c, p, self.observation_size), self.observation_dtype
+        yield "players", (c,), np.int8
+        yield "actions", (c,), np.int16
+        yield "rewards", (c,), np.float32
+        yield "legal_masks", (c, self.num_actions), np.bool_
+        if self.hidden_size:
+            yield "hidden_states", (c, p, self.hidden_size), np.float32
+
+    def __layout_size(self):
+        size = 0
+        for _, shape, dtype in self.__layout():
+            size = -(-size // 8) * 8 + int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return size
+
+    def __map_arrays(self):
+        offset = 0
+        for name, shape, dtype in self.__layout():
+            offset = -(-offset // 8) * 8
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shared.buf, offset=offset)
+            setattr(self, name, array)
+            offset += array.nbytes
+        if not self.hidden_size:
+            self.hidden_states = None
+
+    def __getstate__(self):
+        state = {name: value for name, value in self.__dict__.items() if not isinstance(value, np.ndarray)}
+        del state["shared"]
+        state["hidden_states"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shared = shared_memory.SharedMemory(name=self.name)
+        self.__map_arrays()
+
+    def __len__(self):
+        """
+        Returns the number of steps of the episodes ready to be read.
+        """
+        return int(self._episode_lengths[self._episode_states == READY].sum())
+
+    @property
+    def episodes_appended(self):
+        return int(self._header[1])
+
+    def num_episodes(self):
+        return int((self._episode_states == READY).sum())
+
+    def append(self, observations, players, actions, rewards, legal_masks, hidden_states=None):
+        """
+        Copies one episode into the buffer, evicting the oldest data it overwrites, and returns its episode id.
+        The arrays have one row per step, see Trajectory.
+        Raises:
+            ValueError: If the episode is longer than the capacity or the arrays do not match.
+        """
+        length = len(actions)
+        if not 0 < length <= self.capacity:
+            raise ValueError(f"Episodes must have between 1 and {self.capacity} steps, got {length}.")
+        if (hidden_states is None) != (self.hidden_states is None):
+            raise ValueError("Hidden states must be given exactly when the buffer stores them.")
+        with self.lock:
+            start = int(self._header[0])
+            if start + length > self.capacity:
+                start = 0
+            episode_id = int(self._header[1])
+            states = self._episode_states
+            overlap = (states != 0) & (self._episode_starts < start + length) & (self._episode_starts + self._episode_lengths > start)
+            states[overlap] = 0
+            entry = episode_id % self.max_episodes
+            self._episode_ids[entry] = episode_id
+            self._episode_starts[entry] = start
+            self._episode_lengths[entry] = length
+            self._episode_priorities[entry] = self._max_priority[0]
+            states[entry] = WRITING
+            self._header[0] = start + length
+            self._header[1] = episode_id + 1
+        steps = slice(start, start + length)
+        self.observations[steps] = observations
+        self.players[steps] = players
+        self.actions[steps] = actions
+        self.rewards[steps] = rewards
+        self.legal_masks[steps] = legal_masks
+        if hidden_states is not None:
+            self.hidden_states[steps] = hidden_states
+        with self.lock:
+            # Another writer may have wrapped around the ring and evicted it while it was copied
+            if self._episode_ids[entry] == episode_id and states[entry] == WRITING:
+                states[entry] = READY
+        return episode_id
+
+    def append_episode(self, episode, hidden_states=None):
+        """
+        Appends an object with the arrays of an episode as attributes, like training.train.Episode.
+        """
+        return self.append(episode.observations, episode.players, episode.actions, episode.rewards, episode.legal_masks, hidden_states)
+
+    def __window(self, entry: int, start: int, length: int):
+        first = int(self._episode_starts[entry]) + start
+        steps = slice(first, first + length)
+        return Trajectory(int(self._episode_ids[entry]), start, self.observations[steps], self.players[steps],
+                          self.actions[steps], self.rewards[steps], self.legal_masks[steps],
+                          None if self.hidden_states is None else self.hidden_states[steps])
+
+    def get(self, episode_id: int):
+        """
+        Returns a whole episode as a Trajectory, or None if it is not written yet.
+        Raises:
+            KeyError: If the episode was evicted.
+        """
+        entry = episode_id % self.max_episodes
+        with self.lock:
+            if episode_id >= self._header[1] or (self._episode_ids[entry] == episode_id and self._episode_states[entry] == WRITING):
+                return None
+            if self._episode_ids[entry] != episode_id or self._episode_states[entry] != READY:
+                raise KeyError(f"Episode {episode_id} was evicted.")
+            return self.__window(entry, 0, int(self._episode_lengths[entry]))
+
+    def oldest_episode_id(self):
+        """
+        Returns the id of the oldest episode ready to be read, None if there is none.
+        """
+        ready = self._episode_states == READY
+        return int(self._episode_ids[ready].min()) if ready.any() else None
+
+    def is_valid(self, trajectory: Trajectory):
+        """
+        Tells whether the data of a trajectory is still the one it pointed to, i.e. its episode was not evicted.
+        """
+        entry = trajectory.episode_id % self.max_episodes
+        return bool(self._episode_ids[entry] == trajectory.episode_id and self._episode_states[entry] == READY)
+
+    def sample(self, batch_size: int, length: int, prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4, rng=None):
+        """
+        Samples windows of at most length consecutive steps, each inside one episode, as zero-copy Trajectory views.
+        Episodes are drawn uniformly, or with probability proportional to priority ** alpha, and the start of the window
+        uniformly among the starts that fit. Windows of episodes shorter than length are the whole episode.
+        Returns:
+            trajectories (list): batch_size Trajectory windows.
+            weights (np.ndarray): (batch_size,) importance sampling weights, normalized to a maximum of 1, all ones when uniform.
+        Raises:
+            ValueError: If the buffer has no episode ready.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        with self.lock:
+            entries = np.flatnonzero(self._episode_states == READY)
+            if len(entries) == 0:
+                raise ValueError("The buffer has no episode to sample.")
+            if prioritized:
+                probabilities = self._episode_priorities[entries] ** alpha
+                probabilities /= probabilities.sum()
+                chosen = rng.choice(len(entries), batch_size, p=probabilities)
+                weights = (len(entries) * probabilities[chosen]) ** -beta
+                weights /= weights.max()
+            else:
+                chosen = rng.integers(len(entries), size=batch_size)
+                weights = np.ones(batch_size)
+            chosen = entries[chosen]
+            lengths = self._episode_lengths[chosen]
+            starts = (rng.random(batch_size) * (np.maximum(lengths - length, 0) + 1)).astype(np.int64)
+            trajectories = [self.__window(entry, int(start), int(min(length, episode_length)))
+                            for entry, start, episode_length in zip(chosen, starts, lengths)]
+        return trajectories, weights
+
+    def update_priorities(self, episode_ids, priorities):
+        """
+        Sets the priorities of episodes, for instance to their last loss. Evicted episodes are ignored.
+        """
+        episode_ids = np.asarray(episode_ids, dtype=np.int64)
+        priorities = np.asarray(priorities, dtype=np.float64)
+        with self.lock:
+            entries = episode_ids % self.max_episodes
+            alive = self._episode_ids[entries] == episode_ids
+            self._episode_priorities[entries[alive]] = priorities[alive]
+            if len(priorities):
+                self._max_priority[0] = max(self._max_priority[0], priorities.max())
+
+    def close(self):
+        """
+        Releases the mapping of the shared memory in this process. Views handed out before must not be used afterwards.
+        """
+        for name, _, _ in self.__layout():
+            setattr(self, name, None)
+        self.shared.close()
+
+    def unlink(self):
+        """
+        Closes and frees the shared memory. Called once, by the process that created the buffer.
+        """
+        self.close()
+        self.shared.unlink()
@@ -1,6 +1,399 @@
-def train_agents():
-    for epoch in range(NUM_EPOCHS):
-        rewards = run_simulation(...)
-        loss = -reward.mean()  # use REINFORCE or PPO loss
-        loss.backward()
-        optimizer.step()
+# training/train.py
+"""
+Actor-learner training of the recurrent players, on the CPU.
+
+Actor processes play batches of self-play games with the latest weights they have received and append every finished
+episode to a shared memory TrajectoryBuffer. The learner reads the episodes in order, stacks them into minibatches,
+takes REINFORCE steps with Adam, and every broadcast_interval updates publishes its weights in shared memory, where
+the actors pick them up between turns. Playing and learning overlap, so the actors may be a few updates behind the
+learner; episodes evicted from the buffer before the learner reached them are counted as dropped.
+
+Usage:
+    python -m training.train --players 2 --episodes 10000 --output param.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from agents.player_set import RecurrentPolicy, SetOfPlayers, sigmoid
+from game.hanabi_game import HanabiGame, ActionSpace
+from game.observation import BatchObservationEncoder, observation_size
+from training.replay_buffer import TrajectoryBuffer
+
+class Episode:
+    """
+    One self-play game, as seen by every seat.
+
+    Attributes:
+        observations (np.ndarray): (T, num_players, observation_size) uint8 observations before each turn.
+        players (np.ndarray): (T,) player who acted on each turn.
+        actions (np.ndarray): (T,) action ids.
+        legal_masks (np.ndarray): (T, num_actions) legal actions on each turn.
+        rewards (np.ndarray): (T,) change of score on each turn.
+    """
+    __slots__ = ("observations", "players", "actions", "legal_masks", "rewards")
+
+    def __init__(self, observations, players, actions, legal_masks, rewards):
+        self.observations = observations
+        self.players = players
+        self.actions = actions
+        self.legal_masks = legal_masks
+        self.rewards = rewards
+
+    def __len__(self):
+        return len(self.actions)
+
+    @property
+    def score(self):
+        return int(self.rewards.sum())
+
+class SharedWeights:
+    """
+    Weights of a model in one shared memory array, with a version number bumped on every publish.
+    """
+    def __init__(self, model: RecurrentPolicy):
+        self.shapes = [(name, value.shape) for name, value in model.weights.items()]
+        self.size = sum(int(np.prod(shape)) for _, shape in self.shapes)
+        self.array = mp.RawArray("f", self.size)
+        self.version = mp.Value("q", 0)
+        self.publish(model)
+
+    def publish(self, model: RecurrentPolicy):
+        with self.version.get_lock():
+            flat = np.frombuffer(self.array, dtype=np.float32)
+            flat[:] = np.concatenate([value.ravel() for value in model.weights.values()])
+            self.version.value += 1
+
+    def load(self, model: RecurrentPolicy, version: int = None):
+        """
+        Copies the published weights into model if they are newer than version, and returns the version held by model.
+        """
+        if version is not None and self.version.value == version:
+            return version
+        with self.version.get_lock():
+            flat = np.frombuffer(self.array, dtype=np.float32)
+            weights, offset = {}, 0
+            for name, shape in self.shapes:
+                size = int(np.prod(shape))
+                weights[name] = flat[offset:offset + size].reshape(shape)
+                offset += size
+            model.set_weights(weights)
+            return self.version.value
+
+class Adam:
+    """
+    Adam optimizer over a dictionary of NumPy arrays, updated in place.
+    """
+    def __init__(self, parameters: dict, learning_rate: float = 1e-3, betas=(0.9, 0.999), epsilon: float = 1e-8):
+        self.parameters = parameters
+        self.learning_rate = learning_rate
+        self.betas = betas
+        self.epsilon = epsilon
+        self.steps = 0
+        self.moments = {name: np.zeros_like(value) for name, value in parameters.items()}
+        self.squares = {name: np.zeros_like(value) for name, value in parameters.items()}
+
+    def step(self, gradients: dict):
+        self.steps += 1
+        beta1, beta2 = self.betas
+        correction = np.sqrt(1 - beta2 ** self.steps) / (1 - beta1 ** self.steps)
+        for name, gradient in gradients.items():
+            moment, square = self.moments[name], self.squares[name]
+            moment *= beta1
+            moment += (1 - beta1) * gradient
+            square *= beta2
+            square += (1 - beta2) * gradient * gradient
+            self.parameters[name] -= self.learning_rate * correction * moment / (np.sqrt(square) + self.epsilon)
+
+def stack_episodes(episodes: list, num_actions: int):
+    """
+    Pads episodes to the longest one and stacks them.
+    Returns (observations (B, T, P, O), players (B, T), actions (B, T), legal_masks (B, T, A), rewards (B, T), valid (B, T)).
+    """
+    length = max(len(episode) for episode in episodes)
+    batch = len(episodes)
+    num_players, size = episodes[0].observations.shape[1:]
+    observations = np.zeros((batch, length, num_players, size), dtype=np.uint8)
+    players = np.zeros((batch, length), dtype=np.intp)
+    actions = np.zeros((batch, length), dtype=np.intp)
+    legal_masks = np.ones((batch, length, num_actions), dtype=bool)
+    rewards = np.zeros((batch, length), dtype=np.float32)
+    valid = np.zeros((batch, length), dtype=bool)
+    for index, episode in enumerate(episodes):
+        n = len(episode)
+        observations[index, :n] = episode.observations
+        players[index, :n] = episode.players
+        actions[index, :n] = episode.actions
+        legal_masks[index, :n] = episode.legal_masks
+        rewards[index, :n] = episode.rewards
+        valid[index, :n] = True
+    return observations, players, actions, legal_masks, rewards, valid
+
+def policy_gradient(model: RecurrentPolicy, batch: tuple, discount: float = 1.0):
+    """
+    REINFORCE loss of a minibatch of episodes, stacked by stack_episodes, and its gradients, by backpropagation through time.
+    Each action is weighted by its discounted return minus the mean return of the minibatch, divided by their deviation.
+    Returns (loss, gradients), gradients having the keys and shapes of model.weights.
+    """
+    observations, players, actions, legal_masks, rewards, valid = batch
+    batch, length, num_players = observations.shape[:3]
+    weights = model.weights
+    h = model.hidden_size
+    bias = slice(None) if not model.shared else 0
+
+    returns = np.zeros_like(rewards)
+    running = np.zeros(batch, dtype=np.float32)
+    for t in reversed(range(length)):
+        running = rewards[:, t] + discount * running
+        returns[:, t] = running
+    advantages = returns - returns[valid].mean()
+    advantages /= returns[valid].std() + 1e-6
+    advantages *= valid / valid.sum()
+
+    # Forward pass over the whole sequence, keeping what the backward pass needs
+    games = np.arange(batch)
+    hidden = [model.initial_state(batch, num_players)]
+    cache = []
+    loss = 0.0
+    dlogits = []
+    for t in range(length):
+        x = observations[:, t].astype(model.dtype)
+        gates_input = model.seat_matmul(x, weights["w_input"]) + weights["b_input"][bias]
+        gates_hidden = model.seat_matmul(hidden[t], weights["w_hidden"]) + weights["b_hidden"][bias]
+        reset_update = sigmoid(gates_input[..., :2 * h] + gates_hidden[..., :2 * h])
+        candidate = np.tanh(gates_input[..., 2 * h:] + reset_update[..., :h] * gates_hidden[..., 2 * h:])
+        new_hidden = candidate + reset_update[..., h:] * (hidden[t] - candidate)
+        hidden.append(new_hidden)
+        cache.append((x, gates_hidden, reset_update, candidate))
+        # Only the seat that acted has a loss
+        acting = new_hidden[games, players[:, t]]
+        seat_weights = weights["w_policy"][0 if model.shared else players[:, t]]
+        logits = np.einsum("bh,bha->ba", acting, seat_weights) if not model.shared else acting @ seat_weights
+        logits += weights["b_policy"][0 if model.shared else players[:, t]]
+        logits = np.where(legal_masks[:, t], logits, -np.inf)
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        chosen = probabilities[games, actions[:, t]]
+        loss -= float((advantages[:, t] * np.log(np.maximum(chosen, 1e-12))).sum())
+        probabilities[games, actions[:, t]] -= 1
+        dlogits.append(probabilities * advantages[:, t, None])
+
+    gradients = {name: np.zeros_like(value) for name, value in weights.items()}
+    def add_gradient(name, x, dy):
+        # Sums x^T dy over games, and over seats when the weights are shared
+        if model.shared:
+            gradients[name][0] += x.reshape(-1, x.shape[-1]).T @ dy.reshape(-1, dy.shape[-1])
+        else:
+            gradients[name] += np.matmul(x.transpose(1, 2, 0), dy.transpose(1, 0, 2))
+    def add_bias(name, dy):
+        gradients[name] += dy.sum(axis=(0, 1)) if model.shared else dy.sum(axis=0)
+    def transpose(weight):
+        return weight.transpose(0, 2, 1)
+
+    dhidden = np.zeros_like(hidden[0])
+    for t in reversed(range(length)):
+        x, gates_hidden, reset_update, candidate = cache[t]
+        previous, new_hidden = hidden[t], hidden[t + 1]
+        dlogit = np.zeros((batch, num_players, model.num_actions), dtype=model.dtype)
+        dlogit[games, players[:, t]] = dlogits[t]
+        add_gradient("w_policy", new_hidden, dlogit)
+        add_bias("b_policy", dlogit)
+        dhidden = dhidden + model.seat_matmul(dlogit, transpose(weights["w_policy"]))
+        reset, update = reset_update[..., :h], reset_update[..., h:]
+        dcandidate = dhidden * (1 - update) * (1 - candidate * candidate)
+        dupdate = dhidden * (previous - candidate) * update * (1 - update)
+        dreset = dcandidate * gates_hidden[..., 2 * h:] * reset * (1 - reset)
+        dgates_input = np.concatenate([dreset, dupdate, dcandidate], axis=-1)
+        dgates_hidden = np.concatenate([dreset, dupdate, dcandidate * reset], axis=-1)
+        add_gradient("w_input", x, dgates_input)
+        add_bias("b_input", dgates_input)
+        add_gradient("w_hidden", previous, dgates_hidden)
+        add_bias("b_hidden", dgates_hidden)
+        dhidden = dhidden * update + model.seat_matmul(dgates_hidden, transpose(weights["w_hidden"]))
+    return loss, gradients
+
+def _actor(actor_id: int, model: RecurrentPolicy, shared_weights: SharedWeights, buffer: TrajectoryBuffer, stop, env_steps,
+           num_players: int, num_games: int, seed: int):
+    """
+    Plays num_games games at a time until stop is set, appending each finished Episode to the buffer.
+    """
+    rng = np.random.default_rng([seed, actor_id])
+    version = shared_weights.load(model)
+    games = [HanabiGame(num_players, enable_log=False, seed=int(rng.integers(2 ** 63))) for _ in range(num_games)]
+    encoder = BatchObservationEncoder(games)
+    players = SetOfPlayers(num_players, model, num_games, seed=int(rng.integers(2 ** 63)))
+    legal_masks = np.empty((num_games, model.num_actions), dtype=bool)
+    current = np.empty(num_games, dtype=np.intp)
+    histories = [[] for _ in range(num_games)]
+    while not stop.is_set():
+        version = shared_weights.load(model, version)
+        for index, game in enumerate(games):
+            legal_masks[index] = game.legal_action_array()
+            current[index] = game.current_player_index
+        actions, _ = players.choose_action(encoder.observations, legal_mask=legal_masks, current_players=current)
+        for index, game in enumerate(games):
+            player, action_id = int(current[index]), int(actions[index])
+            score = game.get_score()
+            observations = encoder.observations[index].copy()
+            game.step_id(action_id)
+            encoder.update(index, game.action_space.actions[player][action_id])
+            histories[index].append((observations, player, action_id, legal_masks[index].copy(), game.get_score() - score))
+            if game.is_game_over():
+                observations, players_, actions_, masks, rewards = zip(*histories[index])
+                buffer.append_episode(Episode(np.stack(observations), np.array(players_, dtype=np.int8), np.array(actions_, dtype=np.int16),
+                                     np.stack(masks), np.array(rewards, dtype=np.int8)))
+                histories[index] = []
+                game.reset(int(rng.integers(2 ** 63)))
+                encoder.encoders[index].reset()
+                players.reset([index])
+        with env_steps.get_lock():
+            env_steps.value += num_games
+
+def train_agents(num_players: int, episodes: int, actors: int = 2, games_per_actor: int = 16, batch_size: int = 32,
+                 hidden_size: int = 64, shared: bool = True, learning_rate: float = 1e-3, broadcast_interval: int = 1,
+                 seed: int = 0, buffer_steps: int = 2 ** 16, report_interval: float = 5.0, report=print):
+    """
+    Trains a RecurrentPolicy by self-play with actor processes and a learner in the current process.
+    Args:
+        num_players (int): Number of players in each game.
+        episodes (int): Number of episodes the learner consumes before stopping.
+        actors (int): Number of actor processes.
+        games_per_actor (int): Games each actor plays at once, in one batched forward pass per turn.
+        batch_size (int): Episodes per learner update.
+        hidden_size (int): Size of the GRU state.
+        shared (bool): Share the weights across seats, otherwise one set of weights per seat.
+        learning_rate (float): Adam learning rate.
+        broadcast_interval (int): Number of updates between two publications of the weights to the actors.
+        seed (int): Seed of the weights and of the games.
+        buffer_steps (int): Capacity, in steps, of the TrajectoryBuffer between the actors and the learner.
+        report_interval (float): Seconds between two progress reports.
+        report: Called with a dictionary of counters (env steps/s, updates/s, mean score...) at every report.
+    Returns:
+        (RecurrentPolicy, dict): The trained model and the final counters.
+    """
+    num_actions = ActionSpace.for_players(num_players).num_actions
+    model = RecurrentPolicy(observation_size(num_players), num_actions, hidden_size,
+                            num_seats=None if shared else num_players, seed=seed)
+    optimizer = Adam(model.weights, learning_rate)
+    shared_weights = SharedWeights(model)
+    buffer = TrajectoryBuffer(buffer_steps, num_players, observation_size(num_players), num_actions)
+    stop = mp.Event()
+    env_steps = mp.Value("q", 0)
+    processes = [mp.Process(target=_actor, args=(actor_id, model, shared_weights, buffer, stop, env_steps,
+                                                  num_players, games_per_actor, seed), daemon=True)
+                 for actor_id in range(actors)]
+    for process in processes:
+        process.start()
+
+    start = last_report = time.perf_counter()
+    consumed = updates = dropped = next_episode = 0
+    scores = []
+    counters = {}
+    try:
+        while consumed < episodes:
+            minibatch = []
+            while len(minibatch) < min(batch_size, episodes - consumed):
+                try:
+                    trajectory = buffer.get(next_episode)
+                except KeyError:
+                    # The actors got a whole buffer ahead and overwrote it
+                    dropped += 1
+                    next_episode += 1
+                    continue
+                if trajectory is None:
+                    time.sleep(0.001)
+                    continue
+                minibatch.append(trajectory)
+                next_episode += 1
+            batch = stack_episodes(minibatch, num_actions)
+            # The views may have been overwritten while they were copied
+            valid = [buffer.is_valid(trajectory) for trajectory in minibatch]
+            dropped += valid.count(False)
+            minibatch = [trajectory for trajectory, keep in zip(minibatch, valid) if keep]
+            if not minibatch:
+                continue
+            if not all(valid):
+                batch = stack_episodes(minibatch, num_actions)
+            consumed += len(minibatch)
+            scores.extend(trajectory.score for trajectory in minibatch)
+            loss, gradients = policy_gradient(model, batch)
+            optimizer.step(gradients)
+            updates += 1
+            if updates % broadcast_interval == 0:
+                shared_weights.publish(model)
+            now = time.perf_counter()
+            if now - last_report >= report_interval or consumed >= episodes:
+                elapsed = now - start
+                counters = {
+                    "episodes": consumed,
+                    "updates": updates,
+                    "dropped": dropped,
+                    "env_steps": env_steps.value,
+                    "env_steps_per_second": env_steps.value / elapsed,
+                    "updates_per_second": updates / elapsed,
+                    "mean_score": float(np.mean(scores)),
+                    "loss": loss,
+                }
+                scores = []
+                last_report = now
+                if report is not None:
+                    report(counters)
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+        minibatch = trajectory = None
+        buffer.unlink()
+    return model, counters
+
+def save_weights(model: RecurrentPolicy, path: str):
+    """
+    Saves the weights and sizes of a model as JSON.
+    """
+    with open(path, "w") as file:
+        json.dump({
+            "observation_size": model.observation_size,
+            "num_actions": model.num_actions,
+            "hidden_size": model.hidden_size,
+            "num_seats": model.num_seats,
+            "weights": {name: value.tolist() for name, value in model.weights.items()},
+        }, file)
+
+def load_weights(path: str):
+    """
+    Loads a model saved by save_weights.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    model = RecurrentPolicy(data["observation_size"], data["num_actions"], data["hidden_size"], data["num_seats"])
+    model.set_weights({name: np.array(value) for name, value in data["weights"].items()})
+    return model
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trains recurrent Hanabi players by self-play.")
+    parser.add_argument("--players", type=int, default=2, help="Number of players in each game")
+    parser.add_argument("--episodes", type=int, default=10000, help="Number of episodes to learn from")
+    parser.add_argument("--actors", type=int, default=2, help="Number of actor processes")
+    parser.add_argument("--games-per-actor", type=int, default=16, help="Games each actor plays at once")
+    parser.add_argument("--batch-size", type=int, default=32, help="Episodes per update")
+    parser.add_argument("--hidden-size", type=int, default=64, help="Size of the GRU state")
+    parser.add_argument("--per-seat", action="store_true", help="Train one set of weights per seat")
+    parser.add_argument("--learning-rate", type=float, default=1e-3, help="Adam learning rate")
+    parser.add_argument("--broadcast-interval", type=int, default=1, help="Updates between two weight broadcasts")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the weights and games")
+    parser.add_argument("--output", help="JSON file to save the trained weights to")
+    args = parser.parse_args(argv)
+    report = lambda counters: print(", ".join(f"{name} {value:.3f}" if isinstance(value, float) else f"{name} {value}"
+                                               for name, value in counters.items()))
+    model, _ = train_agents(args.players, args.episodes, args.actors, args.games_per_actor, args.batch_size,
+                            args.hidden_size, not args.per_seat, args.learning_rate, args.broadcast_interval,
+                            args.seed, report=report)
+    if args.output:
+        save_weights(model, args.output)
+
+if __name__ == "__main__":
+    main()